@@ -0,0 +1,362 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+# Benchmarks for the merge, load and export paths, on synthetic files generated locally.
+#
+#   python benchmarks.py                          run everything and print the results
+#   python benchmarks.py --save-baseline          ... and store them as the baseline
+#   python benchmarks.py --compare                ... and fail when one got slower or bigger than the baseline
+#   python benchmarks.py merge export --scale 0.2 only some benchmarks, on a smaller corpus
+#
+# Every benchmark runs in a fresh process, so peak memory (RSS of the process and its workers) is its own.
+# The corpus is generated once per scale with a fixed seed and reused from the corpus folder after that.
+
+BENCHMARK_VERSION = 1  # Bump when the corpus or the benchmarks change, so old baselines are not compared
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "pdf_merger_benchmarks")
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.2  # Allowed slowdown or growth against the baseline, as a fraction
+RSS_SAMPLE_INTERVAL = 0.02  # Seconds between two samples of the memory in use
+
+# Corpus size at scale 1
+SMALL_PDF_COUNT = 200
+SMALL_PDF_PAGES = 3
+HUGE_PDF_PAGES = 2000
+IMAGE_COUNT = 300  # Half JPEG, half PNG
+IMAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+RENDER_PAGES = 200  # Pages of the huge PDF rasterized by the render benchmark
+EDITOR_IMAGES = 50  # Images dropped on the editor along with the PDFs
+
+
+def corpus_files(corpus_dir):
+    """The files of a generated corpus: {"small_pdfs", "huge_pdf", "images"}."""
+    with open(os.path.join(corpus_dir, "corpus.json"), encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+
+def make_corpus(corpus_dir, scale=1.0, seed=1):
+    """Generate the corpus into corpus_dir unless a complete one for this scale is already there."""
+    import fitz  # PyMuPDF
+    from PIL import Image, ImageDraw
+
+    index_file = os.path.join(corpus_dir, "corpus.json")
+    if os.path.exists(index_file):
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == BENCHMARK_VERSION and index.get("scale") == scale:
+            return index["files"]
+    os.makedirs(corpus_dir, exist_ok=True)
+    rng = random.Random(seed)
+    words = ["invoice", "total", "page", "report", "scan", "contract", "amount", "date", "signature", "appendix"]
+
+    def text_page(doc, lines):
+        page = doc.new_page(width=595, height=842)
+        for line in range(lines):
+            page.insert_text((50, 60 + line * 14), " ".join(rng.choice(words) for _ in range(12)), fontsize=10)
+        page.draw_rect(fitz.Rect(40, 40, 555, 802), color=(0.2, 0.2, 0.6), width=1)
+
+    small_pdfs = []
+    for i in range(max(1, round(SMALL_PDF_COUNT * scale))):
+        path = os.path.join(corpus_dir, f"small_{i:04d}.pdf")
+        with fitz.open() as doc:
+            for _ in range(SMALL_PDF_PAGES):
+                text_page(doc, 40)
+            doc.save(path)
+        small_pdfs.append(path)
+
+    # Scanned archives are mostly one image per page; a few distinct images keep generating it quick
+    scans = []
+    for i in range(4):
+        scan = Image.effect_noise(IMAGE_SIZE, 40 + i * 10).convert("RGB")
+        data = io.BytesIO()
+        scan.save(data, "JPEG", quality=70)
+        scans.append(data.getvalue())
+    huge_pdf = os.path.join(corpus_dir, "huge.pdf")
+    with fitz.open() as doc:
+        for i in range(max(1, round(HUGE_PDF_PAGES * scale))):
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(page.rect, stream=scans[i % len(scans)])
+            page.insert_text((50, 40), f"Page {i + 1}", fontsize=14)
+        doc.save(huge_pdf)
+
+    images = []
+    for i in range(max(2, round(IMAGE_COUNT * scale))):
+        image = Image.new("RGB", IMAGE_SIZE, tuple(rng.randrange(180, 256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(60):
+            x, y = rng.randrange(IMAGE_SIZE[0]), rng.randrange(IMAGE_SIZE[1])
+            draw.rectangle((x, y, x + rng.randrange(20, 300), y + rng.randrange(5, 40)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(corpus_dir, f"image_{i:04d}.{'jpg' if i % 2 == 0 else 'png'}")
+        if path.endswith(".jpg"):
+            image.save(path, quality=85)
+        else:
+            image.save(path)
+        images.append(path)
+
+    files = {"small_pdfs": small_pdfs, "huge_pdf": huge_pdf, "images": images}
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump({"version": BENCHMARK_VERSION, "scale": scale, "files": files}, f, indent=1)
+    return files
+
+
+def bench_merge(files, work_dir):
+    """The merger's Convert: images and small PDFs into one PDF (headless)."""
+    from image_pdf_converter import ImagePDFConverter
+
+    output = os.path.join(work_dir, "merged.pdf")
+    inputs = files["images"] + files["small_pdfs"]
+    ImagePDFConverter(inputs, output).convert()
+    return len(inputs), "files", output
+
+
+def bench_read(files, work_dir):
+    """Opening and measuring every page of the PDFs, as the editor's loading workers do (headless)."""
+    from page_renderer import read_file
+
+    pages = 0
+    for path in files["small_pdfs"] + [files["huge_pdf"]]:
+        pages += len(read_file(path)[1])
+    return pages, "pages", None
+
+
+def bench_render(files, work_dir):
+    """Rasterizing thumbnails of the huge PDF at the editor's default tier, without the thumbnail store (headless)."""
+    import fitz  # PyMuPDF
+
+    from page_renderer import render_page
+
+    with fitz.open(files["huge_pdf"]) as doc:
+        count = min(RENDER_PAGES, len(doc))
+    for page_index in range(count):
+        render_page(files["huge_pdf"], page_index, 400)
+    return count, "pages", None
+
+
+def bench_export(files, work_dir, profile="fast"):
+    """The editor's Create PDF: every page of the huge PDF and the small PDFs into one file (headless)."""
+    import fitz  # PyMuPDF
+
+    from pdf_exporter import export_pages
+
+    pages = []
+    for path in [files["huge_pdf"]] + files["small_pdfs"]:
+        with fitz.open(path) as doc:
+            pages.extend((path, index, 0) for index in range(len(doc)))
+    output = os.path.join(work_dir, f"export_{profile}.pdf")
+    export_pages(pages, output, profile=profile)
+    return len(pages), "pages", output
+
+
+def bench_export_compact(files, work_dir):
+    """As export, with the compact save profile."""
+    return bench_export(files, work_dir, "compact")
+
+
+def bench_editor_load(files, work_dir):
+    """
+    Dropping the PDFs and some images on the editor, on Qt's offscreen platform: until every file is in the
+    page list and the thumbnails in view are rendered.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    import pdf_editor
+
+    pdf_editor.THUMBNAIL_DISK_CACHE_DIR = os.path.join(work_dir, "thumbnails")  # Start without stored thumbnails
+    app = QApplication.instance() or QApplication([])
+    window = pdf_editor.MainWindow()
+    window.show()
+    for path in files["small_pdfs"] + [files["huge_pdf"]] + files["images"][:EDITOR_IMAGES]:
+        window.load_pdf_or_image(path)
+    while window.pending_loads or window.pending_renders or window.visible_pages_timer.isActive():
+        app.processEvents()
+        time.sleep(0.001)
+    pages = len(window.page_list)
+    window.close()
+    return pages, "pages", None
+
+
+BENCHMARKS = {
+    "merge": bench_merge,
+    "read": bench_read,
+    "render": bench_render,
+    "export": bench_export,
+    "export_compact": bench_export_compact,
+    "editor_load": bench_editor_load,
+}
+
+
+class PeakMemory:
+    """Samples the RSS of this process and its children (the worker pools) on a thread, keeping the peak."""
+
+    def __init__(self):
+        self.process = psutil.Process()
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self):
+        total = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass  # Workers may exit between listing and sampling
+        self.peak = max(self.peak, total)
+
+    def run(self):
+        while not self.stopped.wait(RSS_SAMPLE_INTERVAL):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        return False
+
+
+def run_one(name, corpus_dir):
+    """Run one benchmark in this process and return its measurements."""
+    files = corpus_files(corpus_dir)
+    with tempfile.TemporaryDirectory() as work_dir, PeakMemory() as memory:
+        start = time.perf_counter()
+        count, unit, output = BENCHMARKS[name](files, work_dir)
+        seconds = time.perf_counter() - start
+        output_size = os.path.getsize(output) if output else None
+    return {
+        "seconds": round(seconds, 3),
+        "throughput": round(count / seconds, 2),
+        "unit": f"{unit}/s",
+        "peak_rss_mb": round(memory.peak / (1024 * 1024), 1),
+        "output_mb": None if output_size is None else round(output_size / (1024 * 1024), 2),
+    }
+
+
+def run_isolated(name, corpus_dir):
+    """Run one benchmark in a fresh interpreter and return its measurements."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-one", name, "--corpus", corpus_dir],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark {name} failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(names, corpus_dir, repeat=3):
+    """Run each benchmark `repeat` times; keeps the median time and the highest peak memory."""
+    results = {}
+    for name in names:
+        runs = [run_isolated(name, corpus_dir) for _ in range(repeat)]
+        result = min(runs, key=lambda run: abs(run["seconds"] - statistics.median(r["seconds"] for r in runs)))
+        result["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+        results[name] = result
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return messages for every result that is slower, or uses more memory or output, than the baseline allows."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, label in (("seconds", "time"), ("peak_rss_mb", "peak memory"), ("output_mb", "output size")):
+            if result.get(key) is not None and base.get(key) and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {label} {base[key]} -> {result[key]} ({result[key] / base[key] - 1:+.0%})")
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':16} {'seconds':>9} {'throughput':>18} {'peak RSS':>10} {'output':>9}  baseline")
+    for name, result in results.items():
+        output = "" if result["output_mb"] is None else f"{result['output_mb']} MB"
+        base = (baseline or {}).get(name)
+        change = f"{result['seconds'] / base['seconds'] - 1:+.0%} time" if base and base.get("seconds") else ""
+        print(f"{name:16} {result['seconds']:9.3f} {result['throughput']:>10} {result['unit']:7} "
+              f"{result['peak_rss_mb']:7} MB {output:>9}  {change}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmark the merge, load and export paths.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="corpus size relative to the default (default: 1)")
+    parser.add_argument("--corpus", help=f"corpus folder (default: {DEFAULT_CORPUS_DIR}/scale-<scale>)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the median counts (default: 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help=f"baseline file (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="exit with 1 when a result regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed regression as a fraction (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {unknown[0]!r}, use one of {', '.join(BENCHMARKS)}")
+    corpus_dir = args.corpus or os.path.join(DEFAULT_CORPUS_DIR, f"scale-{args.scale:g}")
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, corpus_dir)))
+        return 0
+
+    print(f"Preparing corpus in {corpus_dir}...", file=sys.stderr)
+    make_corpus(corpus_dir, args.scale)
+    results = run_suite(args.benchmarks or list(BENCHMARKS), corpus_dir, max(1, args.repeat))
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("version") == BENCHMARK_VERSION and stored.get("scale") == args.scale:
+            baseline = stored["results"]
+        else:
+            print(f"Ignoring {args.baseline}: it was made for another corpus", file=sys.stderr)
+
+    if args.json:
+        json.dump({"scale": args.scale, "results": results}, sys.stdout, indent=2)
+        print()
+    else:
+        print_results(results, baseline)
+
+    if args.save_baseline:
+        merged = dict(baseline or {}, **results)  # Keep the baselines of benchmarks that were not run
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"version": BENCHMARK_VERSION, "scale": args.scale, "results": merged}, f, indent=2)
+        print(f"Saved the baseline to {args.baseline}", file=sys.stderr)
+
+    if args.compare:
+        if baseline is None:
+            print("No baseline to compare with, run with --save-baseline first", file=sys.stderr)
+            return 2
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
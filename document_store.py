@@ -0,0 +1,62 @@
+import hashlib
+
+import fitz  # PyMuPDF
+
+# Shared by the editor, the render workers and the export process.
+
+MEMORY_PREFIX = "memory://"
+
+
+def is_memory_source(source):
+    return source.startswith(MEMORY_PREFIX)
+
+
+def open_document(source, memory_documents=None):
+    """
+    Open a page source: a PDF file path, or the key of an in-memory PDF found in memory_documents.
+    """
+    if is_memory_source(source):
+        return fitz.open(stream=memory_documents[source], filetype="pdf")
+    return fitz.open(source)
+
+
+class DocumentStore:
+    """
+    PDFs that only exist in memory, such as the one-page documents made from dropped images.
+    Each one is addressed by a "memory://" source key that is used wherever a file path would be.
+    """
+
+    def __init__(self):
+        self.documents = {}  # Source key -> PDF bytes
+        self.fingerprints = {}  # Source key -> SHA-1 of its bytes, for the persistent thumbnail store
+        self.counter = 0
+
+    def add(self, name, data):
+        self.counter += 1
+        source = f"{MEMORY_PREFIX}{self.counter}/{name}"
+        self.documents[source] = data
+        self.fingerprints[source] = hashlib.sha1(data).hexdigest()
+        return source
+
+    def get(self, source):
+        """Return the PDF bytes for an in-memory source, or None for a file path."""
+        return self.documents.get(source)
+
+    def fingerprint(self, source):
+        """Return the fingerprint of an in-memory source, or None for a file path."""
+        return self.fingerprints.get(source)
+
+    def used_bytes(self):
+        return sum(len(data) for data in self.documents.values())
+
+    def subset(self, sources):
+        """Return the in-memory documents among `sources`, to hand them to another process."""
+        return {source: self.documents[source] for source in set(sources) if source in self.documents}
+
+    def retain(self, sources):
+        """Forget every document that is not in `sources`, e.g. once all of its pages were removed."""
+        sources = set(sources)
+        for source in list(self.documents):
+            if source not in sources:
+                del self.documents[source]
+                del self.fingerprints[source]
@@ -0,0 +1,124 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+
+# Folder scanning shared by the merger, the editor and the command line tools.
+
+BATCH_SIZE = 500  # Files passed on at once while scanning
+BATCH_INTERVAL = 0.25  # Seconds after which a partial batch is passed on anyway, so slow shares still show progress
+
+
+def natural_key(name):
+    """Sort key that orders embedded numbers by value: "scan2" before "scan10"."""
+    return [int(part) if part.isdigit() else part.casefold() for part in re.split(r"(\d+)", name)]
+
+
+def _matches(name, patterns):
+    name = name.casefold()
+    return any(fnmatch.fnmatchcase(name, pattern.casefold()) for pattern in patterns)
+
+
+def split_patterns(text):
+    """Turn "*.pdf; invoice_*" into ["*.pdf", "invoice_*"]."""
+    return [pattern.strip() for pattern in re.split(r"[;,]", text) if pattern.strip()]
+
+
+def scan_paths(paths, extensions, include=(), exclude=(), cancelled=None):
+    """
+    Yield the files with one of the extensions among `paths`, in the given order. Folders are searched
+    recursively with os.scandir: the files of a folder come first, then its subfolders, each in natural order.
+    Inside folders, files must match one of the `include` globs when there are any, and files and folders
+    matching an `exclude` glob are skipped. Globs are matched against names, ignoring case.
+    Stops early once cancelled() returns True. Folders that cannot be read are skipped.
+    """
+    for path in paths:
+        if cancelled is not None and cancelled():
+            return
+        if os.path.isdir(path):
+            yield from _scan_folder(path, extensions, include, exclude, cancelled)
+        elif path.lower().endswith(extensions):
+            yield path  # Files given by name are always taken
+
+
+def _wanted(name, extensions, include, exclude):
+    return (
+        name.lower().endswith(extensions)
+        and (not include or _matches(name, include))
+        and not (exclude and _matches(name, exclude))
+    )
+
+
+def _scan_folder(folder, extensions, include, exclude, cancelled):
+    pending = [folder]  # Folders still to scan, the next one last; a stack instead of recursion copes with deep trees
+    while pending:
+        if cancelled is not None and cancelled():
+            return
+        current = pending.pop()
+        files = []
+        folders = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):  # Like os.walk, so links cannot loop
+                            if not (exclude and _matches(entry.name, exclude)):
+                                folders.append(entry)
+                        elif _wanted(entry.name, extensions, include, exclude):
+                            files.append(entry)
+                    except OSError:
+                        continue  # Entries can vanish or be unreadable while scanning
+        except OSError:
+            continue
+        files.sort(key=lambda entry: natural_key(entry.name))
+        for entry in files:
+            yield entry.path
+        folders.sort(key=lambda entry: natural_key(entry.name), reverse=True)
+        pending.extend(entry.path for entry in folders)
+
+
+class FolderScan:
+    """
+    Runs scan_paths on a background thread. on_batch(paths) is called with the files found, in order and in
+    batches, and on_finished(count, cancelled) once at the end, both from the scanning thread.
+    """
+
+    def __init__(self, paths, extensions, on_batch, on_finished=None, include=(), exclude=()):
+        self.paths = list(paths)
+        self.extensions = tuple(extensions)
+        self.include = include
+        self.exclude = exclude
+        self.on_batch = on_batch
+        self.on_finished = on_finished
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def run(self):
+        count = 0
+        batch = []
+        last_batch = time.monotonic()
+        for path in scan_paths(self.paths, self.extensions, self.include, self.exclude, self.is_cancelled):
+            batch.append(path)
+            if len(batch) >= BATCH_SIZE or time.monotonic() - last_batch >= BATCH_INTERVAL:
+                count += len(batch)
+                self.on_batch(batch)
+                batch = []
+                last_batch = time.monotonic()
+        if batch and not self.is_cancelled():
+            count += len(batch)
+            self.on_batch(batch)
+        if self.on_finished is not None:
+            self.on_finished(count, self.is_cancelled())
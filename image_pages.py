@@ -0,0 +1,55 @@
+import io
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Image preparation shared by the merger and the editor.
+
+# JPEGs in these modes can be embedded in a PDF as they are (DCTDecode), with this color space
+JPEG_COLOR_SPACES = {"RGB": "/DeviceRGB", "L": "/DeviceGray"}
+DEFAULT_DPI = 96  # Resolution MuPDF assumes for images that do not specify one
+
+
+def prepare_image_page(file_path, quality=100):
+    """
+    Return (jpeg_data, width, height, color_space) for an image, ready to be embedded as a DCTDecode image.
+    RGB and grayscale JPEGs are passed through without decoding them; other images are converted to RGB
+    and encoded as JPEG.
+    """
+    with Image.open(file_path) as image:  # Only reads the header until the pixels are needed
+        width, height = image.size
+        if image.format == "JPEG" and image.mode in JPEG_COLOR_SPACES:
+            with open(file_path, "rb") as f:
+                return f.read(), width, height, JPEG_COLOR_SPACES[image.mode]
+        rgb_image = image.convert("RGB")
+    jpeg = io.BytesIO()
+    rgb_image.save(jpeg, "JPEG", quality=quality)
+    return jpeg.getvalue(), width, height, "/DeviceRGB"
+
+
+def image_page_size(file_path):
+    """
+    Return the (width, height) in points of a page that shows the image at its own resolution,
+    reading only the image header.
+    """
+    with Image.open(file_path) as image:
+        width, height = image.size
+        x_dpi, y_dpi = image.info.get("dpi", (DEFAULT_DPI, DEFAULT_DPI))
+    x_dpi = x_dpi if x_dpi and x_dpi > 0 else DEFAULT_DPI
+    y_dpi = y_dpi if y_dpi and y_dpi > 0 else DEFAULT_DPI
+    return width * 72 / x_dpi, height * 72 / y_dpi
+
+
+def image_page_pdf(file_path):
+    """
+    Return the bytes of a one-page PDF showing the image at its own resolution, built entirely in memory.
+    JPEG data is embedded as is, other formats are transcoded by MuPDF.
+    """
+    width, height = image_page_size(file_path)
+    pdf_doc = fitz.open()
+    try:
+        pdf_page = pdf_doc.new_page(width=width, height=height)
+        pdf_page.insert_image(pdf_page.rect, filename=file_path)
+        return pdf_doc.tobytes()
+    finally:
+        pdf_doc.close()
@@ -0,0 +1,102 @@
+import contextlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from image_pages import prepare_image_page
+from pdf_exporter import partial_file
+from streaming_pdf_writer import StreamingPdfWriter
+
+# The merge engine behind pdf_merger and the command line tools.
+
+IMAGE_WORKERS = None  # Processes used to prepare images for conversion; None uses every core
+
+
+class ImagePDFConverter:
+    def __init__(self, file_list, output_file, workers=IMAGE_WORKERS, open_reader=None):
+        self.file_list = file_list  # Expect a list of file paths
+        self.output_file = output_file
+        self.workers = workers or os.cpu_count()  # Processes that prepare images in parallel; 1 prepares them inline
+        self.open_reader = open_reader  # Optional function returning a parsed PdfReader for a path, e.g. from a cache
+
+    def convert(self):
+        """
+        Merge the inputs into the output file and return a status message.
+        Raises ValueError when none of the inputs has a page, and leaves the output untouched then.
+        """
+        # Inputs are written out one at a time, in list order, so memory use is bounded by the largest
+        # inputs in flight instead of the whole list. The file is written next to the output and only renamed
+        # once complete, so a failing input neither leaves a broken file behind nor replaces an existing one.
+        num_images = 0
+        num_pdfs = 0
+        temp_file = partial_file(self.output_file)
+        try:
+            with open(temp_file, "wb") as f, self.create_pool() as pool:
+                writer = StreamingPdfWriter(f)
+                for file_path, prepared_image in self.prepared_inputs(pool):
+                    if prepared_image is not None:
+                        jpeg_data, width, height, color_space = prepared_image
+                        # One page per image, at 100 dpi like before
+                        writer.add_jpeg_page(jpeg_data, width, height, color_space, width * 72 / 100, height * 72 / 100)
+                        num_images += 1
+                        num_pdfs += 1
+                    else:
+                        reader = self.open_reader(file_path) if self.open_reader is not None else None
+                        num_pdfs += writer.add_pdf(file_path, reader)
+                if num_pdfs == 0:
+                    raise ValueError('No images or PDF files found in the provided file list!')
+                writer.close()
+            os.replace(temp_file, self.output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+        # Print success messages
+        status = ""
+        if num_images > 0:
+            status += f'Successfully converted {num_images} image(s) to PDF.'
+        status += f'\nSuccessfully combined {num_pdfs} page(s) into {self.output_file}.'
+        return status
+
+    def create_pool(self):
+        image_count = sum(1 for file_path in self.file_list if file_path.lower().endswith(('.png', '.jpg', '.jpeg')))
+        if self.workers <= 1 or image_count <= 1:
+            return contextlib.nullcontext()  # Not worth starting processes for
+        workers = min(self.workers, image_count)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def prepared_inputs(self, pool):
+        """
+        Yield (file_path, prepared_image) for every input in list order; prepared_image is None for PDFs.
+        Images are prepared in the pool (JPEG pass-through, or decode and encode), a limited number ahead
+        of the writer so finished images never pile up in memory.
+        """
+        max_ahead = 2 * self.workers
+        window = deque()
+        for file_path in self.file_list:
+            if file_path == self.output_file:
+                continue
+
+            filename = os.path.basename(file_path)
+            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                if pool is None:
+                    window.append((file_path, None, prepare_image_page(file_path)))
+                else:
+                    window.append((file_path, pool.submit(prepare_image_page, file_path), None))
+            elif filename.lower().endswith('.pdf'):
+                window.append((file_path, None, None))
+            else:
+                continue
+
+            while len(window) > max_ahead:
+                yield self.resolve_input(window.popleft())
+        while window:
+            yield self.resolve_input(window.popleft())
+
+    @staticmethod
+    def resolve_input(entry):
+        file_path, future, prepared_image = entry
+        if future is not None:
+            prepared_image = future.result()
+        return file_path, prepared_image
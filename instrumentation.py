@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+
+# Timing spans for profiling real sessions.
+#
+# Off by default, when span() hands out one shared do-nothing context manager. Set PDF_EDITOR_TRACE to an
+# output file to turn it on for a whole session:
+#
+#   PDF_EDITOR_TRACE=session.trace.json python pdf_editor.py   (Chrome trace, open in chrome://tracing or Perfetto)
+#   PDF_EDITOR_TRACE=session.json python pdf_editor.py         (count, total, mean and max milliseconds per span)
+#
+# Spans recorded in worker processes are sent back with the work they timed, see traced_call.
+
+TRACE_ENV = "PDF_EDITOR_TRACE"
+
+_enabled = False
+_events = []  # (name, start_ns, duration_ns, pid, tid, args)
+_lock = threading.Lock()
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter_ns() - self.start
+        event = (self.name, self.start, duration, os.getpid(), threading.get_ident(), self.args)
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **args):
+    """Time a `with` block as one span called name; args are shown with it in Chrome traces."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def take_events():
+    """Remove and return the spans recorded so far."""
+    with _lock:
+        events = _events[:]
+        del _events[:]
+    return events
+
+
+def add_events(events):
+    """Add spans recorded in another process."""
+    with _lock:
+        _events.extend(events)
+
+
+def traced_call(function, *args):
+    """
+    Worker side of a traced task: run function(*args) with tracing on and return (result, spans), so the
+    spans reach the process that writes the trace. Use untrace() on the result there. The spans of a call
+    that raises go out with the next one.
+    """
+    enable()
+    result = function(*args)
+    return result, take_events()
+
+
+def untrace(result):
+    """Unpack a traced_call result, keeping its spans, and return the function's own result."""
+    result, events = result
+    add_events(events)
+    return result
+
+
+def stats():
+    """Aggregated spans: {name: {"count", "total_ms", "mean_ms", "max_ms"}}, slowest total first."""
+    with _lock:
+        events = _events[:]
+    totals = {}
+    for name, _, duration, *_ in events:
+        entry = totals.setdefault(name, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+    return {
+        name: {"count": count, "total_ms": round(total / 1e6, 3), "mean_ms": round(total / count / 1e6, 3),
+               "max_ms": round(longest / 1e6, 3)}
+        for name, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1])
+    }
+
+
+def chrome_trace():
+    """The spans in Chrome's trace event format, one complete ("X") event per span."""
+    with _lock:
+        events = _events[:]
+    return {"traceEvents": [
+        {"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": tid, "args": args}
+        for name, start, duration, pid, tid, args in events
+    ]}
+
+
+def write(path):
+    """Write a Chrome trace when path ends with ".trace.json", otherwise the aggregated stats as JSON."""
+    data = chrome_trace() if path.lower().endswith(".trace.json") else stats()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def enable_from_environment():
+    """Turn tracing on when PDF_EDITOR_TRACE is set and return the output file, or None."""
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        enable()
+    return path or None
@@ -0,0 +1,134 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+from pdf_jobs import JobError, output_key, run_job
+
+# Runs many merge and export jobs (see pdf_jobs) at once, for the command line and the merger window.
+
+DOCUMENT_CACHE_BUDGET = 256 * 1024 * 1024  # File size of the parsed PDFs each worker keeps, in bytes
+
+# Worker process state: parsed PDFs by (path, size, mtime), least recently used first. Each worker runs one
+# job at a time, so every job that lands on a worker shares what earlier jobs there already parsed,
+# e.g. a cover or terms document that goes into every customer's merge.
+_readers = OrderedDict()
+_readers_size = 0
+_readers_budget = DOCUMENT_CACHE_BUDGET
+
+
+def init_job_worker(document_cache_budget=DOCUMENT_CACHE_BUDGET):
+    global _readers_budget
+    _readers_budget = document_cache_budget
+
+
+def cached_reader(pdf_path):
+    """Return a parsed PdfReader for a file, reusing the one an earlier job parsed if the file did not change."""
+    global _readers_size
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+    reader = _readers.get(key)
+    if reader is not None:
+        _readers.move_to_end(key)
+        return reader
+
+    reader = _readers[key] = PdfReader(pdf_path)
+    _readers_size += stat.st_size
+    # The newest document is always kept, even when it is larger than the whole budget
+    while _readers_size > _readers_budget and len(_readers) > 1:
+        (_, old_size, _), _ = _readers.popitem(last=False)
+        _readers_size -= old_size
+    return reader
+
+
+def run_queued_job(job, queued_at, image_workers):
+    """Worker side of a queued job: run_job's result plus the seconds it waited for a worker."""
+    waited = time.time() - queued_at
+    result = run_job(job, image_workers, cached_reader)
+    result["waited"] = round(waited, 3)
+    return result
+
+
+class JobQueue:
+    """
+    Runs normalized jobs (see pdf_jobs.normalize_job) concurrently in a bounded pool of worker processes.
+    Jobs can be submitted at any time, also while others run. on_finished(job_id, result) is called from
+    a background thread as each job ends; status() can be polled instead.
+    """
+
+    def __init__(self, max_workers=None, on_finished=None, document_cache_budget=DOCUMENT_CACHE_BUDGET):
+        self.max_workers = max(1, max_workers or os.cpu_count())
+        # Split the cores between the jobs instead of every merge starting a pool the size of the machine
+        self.image_workers = max(1, os.cpu_count() // self.max_workers)
+        self.on_finished = on_finished
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_job_worker,
+            initargs=(document_cache_budget,),
+        )
+        self.jobs = OrderedDict()  # job id -> (job, future), in submission order
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def submit(self, job):
+        """Queue a job and return its id. Raises JobError while another job writing the same output is pending."""
+        with self.lock:
+            for other, future in self.jobs.values():
+                if not future.done() and output_key(other["output"]) == output_key(job["output"]):
+                    raise JobError(f"A queued job already writes {job['output']}")
+            job_id = next(self.ids)
+            future = self.pool.submit(run_queued_job, job, time.time(), self.image_workers)
+            self.jobs[job_id] = (job, future)
+        future.add_done_callback(lambda done: self._finished(job_id, done))
+        return job_id
+
+    def _finished(self, job_id, future):
+        if self.on_finished is not None:
+            self.on_finished(job_id, self.result(job_id))
+
+    def result(self, job_id):
+        """The job's result (see pdf_jobs.run_job) once it ended, otherwise its "queued" or "running" status."""
+        job, future = self.jobs[job_id]
+        result = {"id": job_id, "name": job["name"], "output": job["output"]}
+        if future.cancelled():
+            result.update(status="cancelled", seconds=0, message="Cancelled before it started.")
+        elif future.done():
+            error = future.exception()
+            if error is None:
+                result.update(future.result())
+            else:
+                # Only happens when the worker process itself died, run_job reports its own errors
+                result.update(status="failed", seconds=0, message=str(error) or type(error).__name__)
+        else:
+            result["status"] = "running" if future.running() else "queued"
+        return result
+
+    def status(self):
+        """Results or current status of every job, in submission order."""
+        with self.lock:
+            job_ids = list(self.jobs)
+        return [self.result(job_id) for job_id in job_ids]
+
+    def pending(self):
+        return sum(1 for _, future in list(self.jobs.values()) if not future.done())
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet. Returns False when it already runs or ended."""
+        return self.jobs[job_id][1].cancel()
+
+    def wait(self):
+        """Block until every submitted job ended and return all results, in submission order."""
+        for _, future in list(self.jobs.values()):
+            if not future.cancelled():
+                future.exception()  # Waits without raising
+        return self.status()
+
+    def shutdown(self, cancel_queued=True):
+        """Stop the workers once the running jobs end; queued jobs are cancelled unless cancel_queued is False."""
+        self.pool.shutdown(wait=False, cancel_futures=cancel_queued)
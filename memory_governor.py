@@ -0,0 +1,58 @@
+import time
+
+import psutil
+
+# Memory bookkeeping for the editor.
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024  # 512 MB
+LOW_SYSTEM_MEMORY = 100 * 1024 * 1024  # Free system memory below which the budget is halved
+SYSTEM_SAMPLE_INTERVAL = 5.0  # Seconds between two samples of the free system memory
+
+
+class MemoryGovernor:
+    """
+    Tracks the memory the application holds itself against a budget. Consumers report the bytes they hold,
+    and when check() finds the total over budget, the relief actions run in the order they were added until
+    it fits again. Free system memory is only sampled every few seconds; while it is low the budget is halved.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_MEMORY_BUDGET, low_system_memory=LOW_SYSTEM_MEMORY,
+                 sample_interval=SYSTEM_SAMPLE_INTERVAL):
+        self.budget_bytes = budget_bytes
+        self.low_system_memory = low_system_memory
+        self.sample_interval = sample_interval
+        self.consumers = {}  # Name -> function returning the bytes it holds
+        self.reliefs = []  # Functions taking the bytes to free and returning the bytes they freed
+        self.system_memory_low = False
+        self.last_sample = None
+
+    def track(self, name, measure):
+        self.consumers[name] = measure
+
+    def add_relief(self, relieve):
+        self.reliefs.append(relieve)
+
+    def usage(self):
+        """Bytes held by each consumer."""
+        return {name: measure() for name, measure in self.consumers.items()}
+
+    def used_bytes(self):
+        return sum(self.usage().values())
+
+    def budget(self):
+        """The budget, halved while the system is low on memory."""
+        now = time.monotonic()
+        if self.last_sample is None or now - self.last_sample >= self.sample_interval:
+            self.last_sample = now
+            self.system_memory_low = psutil.virtual_memory().available < self.low_system_memory
+        return self.budget_bytes // 2 if self.system_memory_low else self.budget_bytes
+
+    def check(self):
+        """Run the relief actions while over budget and return the bytes still held."""
+        budget = self.budget()
+        used = self.used_bytes()
+        for relieve in self.reliefs:
+            if used <= budget:
+                break
+            used -= relieve(used - budget)
+        return used
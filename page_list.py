@@ -0,0 +1,259 @@
+import os
+import sys
+
+# The editor's page list, kept free of Qt so it can be used and tested without a GUI.
+
+
+class PageRecord:
+    """One page of the output: which page of which source, and how it is shown."""
+
+    __slots__ = ("source", "page_index", "rotation", "checked", "width", "height")
+
+    def __init__(self, source, page_index, width=612, height=792):
+        self.source = source  # PDF file path or in-memory source key, shared by all pages of the source
+        self.page_index = page_index  # Zero-based page number in the source
+        self.rotation = 0  # Added to the page's own rotation on export
+        self.checked = False
+        self.width = width  # Page size in points, defaults to US Letter
+        self.height = height
+
+
+class PageListObserver:
+    """
+    Notified about every change of a PageList. "about to" calls come before the records change and the
+    others right after, like Qt's item models expect. Rows are inclusive ranges.
+    """
+
+    def pages_about_to_be_inserted(self, first, last):
+        pass
+
+    def pages_inserted(self, first, last):
+        pass
+
+    def pages_about_to_be_removed(self, first, last):
+        pass
+
+    def pages_removed(self, first, last):
+        pass
+
+    def pages_about_to_be_moved(self, first, last, destination):
+        pass
+
+    def pages_moved(self, first, last, destination):
+        pass
+
+    def pages_changed(self, first, last):
+        pass
+
+    def pages_about_to_be_reordered(self):
+        pass
+
+    def pages_reordered(self, new_rows):
+        # new_rows[old_row] is the row the page moved to
+        pass
+
+    def pages_about_to_be_reset(self):
+        pass
+
+    def pages_reset(self):
+        pass
+
+
+class PageList:
+    """
+    The pages of the document being edited, in output order. Bulk operations work on row numbers and
+    notify the observers once per contiguous run of rows instead of once per page.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.observers = []
+        self.rows = {}  # PageRecord -> row; None once rows shifted, until the next lookup rebuilds it
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, row):
+        return self.records[row]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def row_of(self, record):
+        """Row of a record, without searching the list."""
+        if self.rows is None:
+            self.rows = {record: row for row, record in enumerate(self.records)}
+        return self.rows[record]
+
+    def _notify(self, name, *args):
+        for observer in self.observers:
+            getattr(observer, name)(*args)
+
+    def add_pages(self, source, page_sizes):
+        """Append the pages of a source, given as (width, height) per page in page order."""
+        source = sys.intern(source)  # Every record of a source shares one string
+        records = [PageRecord(source, page_index, width, height) for page_index, (width, height) in enumerate(page_sizes)]
+        if not records:
+            return
+        first = len(self.records)
+        self._notify("pages_about_to_be_inserted", first, first + len(records) - 1)
+        self.records.extend(records)
+        if self.rows is not None:
+            self.rows.update((record, row) for row, record in enumerate(records, first))  # Appending shifts nothing
+        self._notify("pages_inserted", first, first + len(records) - 1)
+
+    def checked_rows(self):
+        return [row for row, record in enumerate(self.records) if record.checked]
+
+    def set_checked(self, checked, rows=None):
+        """Check or uncheck the given rows, or every page when rows is None."""
+        if rows is None:
+            for record in self.records:
+                record.checked = checked
+            self._changed_all()
+        else:
+            for row in rows:
+                self.records[row].checked = checked
+            self._changed_runs(rows)
+
+    def toggle_checked(self, row):
+        self.set_checked(not self.records[row].checked, [row])
+
+    def rotate(self, rows, degrees=90):
+        for row in rows:
+            record = self.records[row]
+            record.rotation = (record.rotation + degrees) % 360
+        self._changed_runs(rows)
+
+    def set_size(self, row, width, height):
+        """Correct the size of a page, e.g. once a page of a large document was measured."""
+        record = self.records[row]
+        record.width, record.height = width, height
+        self._changed_runs([row])
+
+    def remove(self, rows):
+        """Remove the given rows, one contiguous run at a time from the end so the other rows keep their numbers."""
+        for first, last in reversed(_runs(rows)):
+            self._notify("pages_about_to_be_removed", first, last)
+            del self.records[first:last + 1]
+            self.rows = None
+            self._notify("pages_removed", first, last)
+
+    def move(self, first, count, destination):
+        """
+        Move count rows starting at first so they end up in front of the row that is at `destination` before
+        the move. Returns False when that would leave everything in place.
+        """
+        if first <= destination <= first + count:
+            return False
+        last = first + count - 1
+        self._notify("pages_about_to_be_moved", first, last, destination)
+        moved = self.records[first:last + 1]
+        del self.records[first:last + 1]
+        target = destination - count if destination > first else destination
+        self.records[target:target] = moved
+        self.rows = None
+        self._notify("pages_moved", first, last, destination)
+        return True
+
+    def move_rows_to(self, rows, position):
+        """
+        Move the given rows, keeping their order, so the first of them ends up at `position` in the result.
+        """
+        moving = sorted(set(rows))
+        moving_set = set(moving)
+        rest = [row for row in range(len(self.records)) if row not in moving_set]
+        position = max(0, min(position, len(rest)))
+        self.reorder(rest[:position] + moving + rest[position:])
+
+    def reverse(self, first, last):
+        """Reverse the order of the rows from first to last, inclusive."""
+        self.reorder([*range(first), *range(last, first - 1, -1), *range(last + 1, len(self.records))])
+
+    def interleave(self, first_source, second_source, reverse_second=False):
+        """
+        Merge the pages of two sources alternately, e.g. the fronts and backs of a one-sided scan. The backs are
+        often scanned last page first, which reverse_second undoes. Pages left over after the shorter source
+        follow at the end. The merged pages take the place where the first of them was.
+        """
+        first_rows = [row for row, record in enumerate(self.records) if record.source == first_source]
+        second_rows = [row for row, record in enumerate(self.records) if record.source == second_source]
+        if not first_rows or not second_rows:
+            return
+        if reverse_second:
+            second_rows.reverse()
+        merged = [row for pair in zip(first_rows, second_rows) for row in pair]
+        shorter = min(len(first_rows), len(second_rows))
+        merged += first_rows[shorter:] + second_rows[shorter:]
+
+        merged_set = set(merged)
+        start = min(first_rows[0], min(second_rows))
+        rest = [row for row in range(len(self.records)) if row not in merged_set]
+        position = sum(1 for row in rest if row < start)
+        self.reorder(rest[:position] + merged + rest[position:])
+
+    def sort_by_source(self):
+        """Group the pages by source file name, keeping the order of the pages within each source."""
+        self.reorder(sorted(range(len(self.records)), key=lambda row: _source_sort_key(self.records[row].source)))
+
+    def reorder(self, order):
+        """Put the pages in a new order, given as the old row of every new row, as a single change."""
+        if order == list(range(len(self.records))):
+            return
+        self._notify("pages_about_to_be_reordered")
+        new_rows = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            new_rows[old_row] = new_row
+        self.records = [self.records[row] for row in order]
+        self.rows = None
+        self._notify("pages_reordered", new_rows)
+
+    def clear(self):
+        self._notify("pages_about_to_be_reset")
+        self.records = []
+        self.rows = {}
+        self._notify("pages_reset")
+
+    def sources(self):
+        """Sources that still have pages in the list."""
+        return {record.source for record in self.records}
+
+    def export_pages(self, checked_only=False):
+        """The (source, page_index, rotation) entries pdf_exporter takes, in output order."""
+        return [
+            (record.source, record.page_index, record.rotation)
+            for record in self.records
+            if not checked_only or record.checked
+        ]
+
+    def _changed_all(self):
+        if self.records:
+            self._notify("pages_changed", 0, len(self.records) - 1)
+
+    def _changed_runs(self, rows):
+        for first, last in _runs(rows):
+            self._notify("pages_changed", first, last)
+
+
+def source_name(source):
+    """File name of a source, also for in-memory sources ("memory://3/scan.jpg" -> "scan.jpg")."""
+    return os.path.basename(source.replace("\\", "/"))
+
+
+def _source_sort_key(source):
+    # Sources with the same file name in different folders still stay apart
+    return source_name(source).casefold(), source
+
+
+def _runs(rows):
+    """Group row numbers into sorted, inclusive (first, last) runs of consecutive rows."""
+    runs = []
+    for row in sorted(set(rows)):
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
@@ -0,0 +1,115 @@
+import logging
+import os
+
+import fitz  # PyMuPDF
+
+import instrumentation
+from document_store import is_memory_source, open_document
+from image_pages import image_page_pdf, image_page_size
+from thumbnail_cache import DEFAULT_DISK_BUDGET, DiskThumbnailCache, file_fingerprint
+
+# The render worker processes import this module, so neither it nor anything it imports may import PySide6.
+
+MAX_OPEN_DOCUMENTS = 8
+THUMBNAIL_JPEG_QUALITY = 90
+LARGE_DOCUMENT_SIZE = 100_000_000  # Bytes above which a PDF's pages are only measured as they are rendered
+_open_documents = {}
+_fingerprints = {}
+_disk_cache = None
+
+
+class DocumentNotLoaded(LookupError):
+    """Raised by render_page when an in-memory source is not open in this worker; render again with its data."""
+
+
+def init_worker(disk_cache_dir=None, disk_cache_budget=DEFAULT_DISK_BUDGET):
+    """
+    Process pool initializer: opens the persistent thumbnail store shared by all render workers.
+    """
+    global _disk_cache
+    if disk_cache_dir:
+        try:
+            _disk_cache = DiskThumbnailCache(disk_cache_dir, disk_cache_budget)
+        except Exception as e:
+            # Rendering still works without the store, it just is not persisted
+            logging.warning(f"Could not open thumbnail cache in {disk_cache_dir}: {e}")
+
+
+def _open_document(pdf_path, data=None):
+    """
+    Return a cached document handle for this worker process, opening it if needed.
+    `data` holds the PDF bytes of an in-memory source, which is only needed the first time.
+    """
+    doc = _open_documents.pop(pdf_path, None)
+    if doc is None:
+        if data is None and is_memory_source(pdf_path):
+            raise DocumentNotLoaded(pdf_path)
+        doc = open_document(pdf_path, {pdf_path: data})
+    _open_documents[pdf_path] = doc  # Re-insert so the dict stays in least recently used order
+    while len(_open_documents) > MAX_OPEN_DOCUMENTS:
+        oldest_path = next(iter(_open_documents))
+        _open_documents.pop(oldest_path).close()
+    return doc
+
+
+def _fingerprint(pdf_path, fingerprint=None):
+    if fingerprint is not None:
+        return fingerprint  # In-memory sources are hashed once, when they are added to the DocumentStore
+    # Only hash a file again when its size or modification time changed
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_size, stat.st_mtime_ns)
+    fingerprint = _fingerprints.get(key)
+    if fingerprint is None:
+        fingerprint = _fingerprints[key] = file_fingerprint(pdf_path)
+    return fingerprint
+
+
+def read_file(file_path):
+    """
+    Open a file added to the editor and return (pdf_data, page_sizes). Images become a one-page PDF whose
+    bytes are returned as pdf_data; PDFs stay on disk and pdf_data is None. Page sizes are (width, height) in points.
+    Files larger than LARGE_DOCUMENT_SIZE are not measured page by page: every page gets the size of the
+    first one until it is rendered.
+    """
+    if file_path.lower().endswith(".pdf"):
+        # MuPDF reads pages from the file as they are used, so even huge files are not loaded into memory
+        with instrumentation.span("open", file=file_path), fitz.open(file_path) as doc:
+            if len(doc) and os.path.getsize(file_path) > LARGE_DOCUMENT_SIZE:
+                first = doc[0].rect
+                return None, [(first.width, first.height)] * len(doc)
+            return None, [(page.rect.width, page.rect.height) for page in doc]
+    with instrumentation.span("convert image", file=file_path):
+        return image_page_pdf(file_path), [image_page_size(file_path)]
+
+
+def render_page(pdf_path, page_index, size, rotation=0, data=None, fingerprint=None):
+    """
+    Rasterize one page so its long edge is `size` pixels, rotated clockwise by `rotation` degrees,
+    and return (width, height, stride, samples) as RGB888 data.
+    In-memory sources pass their DocumentStore fingerprint, and their PDF bytes as `data` only when this worker
+    may not have them open yet; without them, DocumentNotLoaded is raised.
+    The persistent thumbnail store is checked first, so pages seen before are only decoded.
+    """
+    entry_name = None
+    if _disk_cache is not None and (fingerprint is not None or not is_memory_source(pdf_path)):
+        entry_name = DiskThumbnailCache.entry_name(_fingerprint(pdf_path, fingerprint), page_index, rotation, size)
+        thumbnail = _disk_cache.get(entry_name)
+        if thumbnail is not None:
+            with instrumentation.span("decode stored thumbnail", page=page_index, size=size):
+                pix = fitz.Pixmap(thumbnail)
+                return pix.width, pix.height, pix.stride, pix.samples
+
+    with instrumentation.span("open", file=pdf_path):
+        page = _open_document(pdf_path, data).load_page(page_index)
+    with instrumentation.span("rasterize", page=page_index, size=size):
+        zoom = size / max(page.rect.width, page.rect.height, 1)
+        matrix = fitz.Matrix(zoom, zoom).prerotate(rotation)
+        pix = page.get_pixmap(matrix=matrix, alpha=False)  # Disable alpha channel
+    if not pix.samples:
+        raise ValueError(f"Pixmap samples are null for page {page_index + 1}")
+    if entry_name is not None:
+        try:
+            _disk_cache.put(entry_name, pix.tobytes("jpg", jpg_quality=THUMBNAIL_JPEG_QUALITY))
+        except Exception as e:
+            logging.warning(f"Could not store thumbnail {entry_name}: {e}")
+    return pix.width, pix.height, pix.stride, pix.samples
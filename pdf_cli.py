@@ -0,0 +1,102 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from job_queue import JobQueue, cached_reader
+from pdf_exporter import DEFAULT_SAVE_PROFILE, SAVE_PROFILES
+from pdf_jobs import JobError, check_outputs, load_manifest, normalize_job, parse_page_spec, run_job
+
+# Command line entry point for servers without a display, so neither it nor anything it imports may import PySide6.
+#
+#   python pdf_cli.py merge -o out.pdf scan1.jpg scan2.png report.pdf folder
+#   python pdf_cli.py export -o out.pdf --profile compact a.pdf#1-3 b.pdf#5@90
+#   python pdf_cli.py run nightly.json other.yaml --jobs 4 --json
+#
+# Exit codes: 0 when every job succeeded, 1 when a job failed, 2 for invalid arguments or manifests.
+
+EXIT_OK = 0
+EXIT_JOB_FAILED = 1
+EXIT_USAGE = 2
+
+
+def run_jobs(jobs, parallel=None):
+    """Run jobs in up to `parallel` processes and return their results in job order."""
+    parallel = max(1, min(parallel or os.cpu_count(), len(jobs)))
+    if parallel == 1:
+        return [run_job(job, open_reader=cached_reader) for job in jobs]
+    job_queue = JobQueue(parallel)
+    try:
+        for job in jobs:
+            job_queue.submit(job)
+        return job_queue.wait()
+    finally:
+        job_queue.shutdown()
+
+
+def print_summary(results, seconds, as_json=False):
+    if as_json:
+        json.dump({"seconds": round(seconds, 3), "jobs": results}, sys.stdout, indent=2)
+        print()
+        return
+    for result in results:
+        print(f"{result['status'].upper():6} {result['seconds']:8.2f}s  {result['name']}: {result['message']}")
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print(f"{len(results) - failed} job(s) succeeded, {failed} failed in {seconds:.2f}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pdf_cli", description="Merge and export PDFs without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(command):
+        command.add_argument("-j", "--jobs", type=int, help="jobs to run at the same time (default: one per core)")
+        command.add_argument("--json", action="store_true", help="print the summary as JSON")
+
+    merge = commands.add_parser("merge", help="merge images and PDFs into one PDF, like the merger window")
+    merge.add_argument("-o", "--output", required=True, help="output PDF")
+    merge.add_argument("inputs", nargs="+", help="images, PDFs or folders, in output order")
+    add_common(merge)
+
+    export = commands.add_parser("export", help="export selected pages, like the editor's Create buttons")
+    export.add_argument("-o", "--output", required=True, help="output PDF")
+    export.add_argument("--profile", choices=list(SAVE_PROFILES), default=DEFAULT_SAVE_PROFILE, help="save profile")
+    export.add_argument("pages", nargs="+", metavar="FILE[#PAGES][@ROTATION]",
+                        help="source PDF with optional 1-based pages (e.g. 1-3,7) and rotation in degrees")
+    add_common(export)
+
+    run = commands.add_parser("run", help="run the jobs of one or more JSON or YAML manifests")
+    run.add_argument("manifests", nargs="+", help="manifest files")
+    add_common(run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "merge":
+            jobs = [normalize_job({"type": "merge", "output": args.output, "inputs": args.inputs})]
+        elif args.command == "export":
+            pages = [parse_page_spec(spec) for spec in args.pages]
+            jobs = [normalize_job({"type": "export", "output": args.output, "profile": args.profile, "pages": pages})]
+        else:
+            jobs = [job for manifest in args.manifests for job in load_manifest(manifest)]
+            check_outputs(jobs)  # Also across manifests
+    except (JobError, OSError) as e:
+        print(f"pdf_cli: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not jobs:
+        print("pdf_cli: error: no jobs to run", file=sys.stderr)
+        return EXIT_USAGE
+
+    start = time.perf_counter()
+    results = run_jobs(jobs, args.jobs)
+    print_summary(results, time.perf_counter() - start, args.json)
+    return EXIT_OK if all(result["status"] == "ok" for result in results) else EXIT_JOB_FAILED
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for the job pool in frozen executables
+    sys.exit(main())
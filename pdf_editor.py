@@ -1,21 +1,38 @@
+import multiprocessing
 import os
-import shutil
+import queue
 import subprocess
 import sys
-from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QCheckBox, QListWidget, QListWidgetItem, QPushButton, QFileDialog, QLineEdit, QMessageBox
-from PySide6.QtCore import Qt, QMimeData
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QCheckBox, QPushButton, QFileDialog, QLineEdit, QMessageBox, QInputDialog
+from PySide6.QtCore import Qt, QObject, Signal, QTimer, QAbstractListModel, QModelIndex, QSize, QRect, QEvent
 import fitz  # PyMuPDF
 
-from PySide6.QtWidgets import QListWidgetItem, QWidget, QHBoxLayout, QLabel, QCheckBox
-from PySide6.QtGui import QPixmap, QImage, QDrag, QAction, QTransform
-from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QGridLayout, QScrollArea, QVBoxLayout
+from PySide6.QtGui import QPixmap, QImage, QAction, QTransform, QColor, QPen
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QStyleOptionButton, QAbstractItemView, QProgressBar, QComboBox
 import logging
-import psutil
 
-ENABLE_LOGGING = False
-if not os.path.exists("temp_files"):
-    os.makedirs("temp_files")
+import instrumentation
+from document_store import DocumentStore
+from folder_scanner import FolderScan
+from memory_governor import MemoryGovernor
+from page_renderer import LARGE_DOCUMENT_SIZE, DocumentNotLoaded, init_worker, read_file, render_page
+from page_list import PageList, PageListObserver, source_name
+from pdf_exporter import DEFAULT_SAVE_PROFILE, partial_file, run_export
+from thumbnail_cache import RESOLUTION_TIERS, ThumbnailCache, resolution_tier
+
+ENABLE_LOGGING = bool(os.environ.get("PDF_EDITOR_LOG"))  # Debug log in pdf_editor.log; timings are in instrumentation
+RENDER_MARGIN = 1  # Pages within this many viewport heights of the visible area are rendered ahead of time
+KEEP_MARGIN = 3  # Pixmaps of pages further away than this many viewport heights are released
+THUMBNAIL_CACHE_BUDGET = 256 * 1024 * 1024  # Memory budget for rendered thumbnails, in bytes
+MEMORY_BUDGET = 512 * 1024 * 1024  # Memory the editor may hold for thumbnails, pixmaps and in-memory documents, in bytes
+THUMBNAIL_DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pdf_editor", "thumbnails")
+THUMBNAIL_DISK_CACHE_BUDGET = 1024 * 1024 * 1024  # Size cap of the persistent thumbnail store, in bytes
+RESOLUTION_RAISE_DELAY = 10  # Seconds the resolution stays lowered (or at a tier just raised to) before it goes up again
+EXPORT_CANCEL_TIMEOUT = 2  # Seconds a cancelled export may take to stop by itself before it is terminated
+CELL_MARGIN = 9  # Space around the checkbox and thumbnail inside each grid cell, in pixels
+PAGE_ROLE = Qt.UserRole  # Model role that returns the PageRecord of a row
 
 if ENABLE_LOGGING:
     logging.basicConfig(filename='pdf_editor.log', level=logging.DEBUG)
@@ -23,92 +40,438 @@ else:
     logging.basicConfig(handlers=[logging.NullHandler()])
 
 
-class PdfPageItem(QWidget):
-    def __init__(self, page_number, image, original_pdf_path, original_page_number):
-        super().__init__()
-        self.original_page_number = original_page_number  # Store the original page number
-        self.original_pdf_path = original_pdf_path  # Store the path of the original PDF
-        self.page_number = page_number  # This
-        self.rotation = 0  # Add rotation property
+class RenderSignals(QObject):
+    # Emitted from the executor's callback thread; Qt queues it onto the GUI thread
+    page_rendered = Signal(object, object, object)
+
+
+class LoadSignals(QObject):
+    # Emitted from the executor's callback thread once a file was read
+    file_read = Signal(object)
+
+
+class FileLoad:
+    """A file being read in the render pool, waiting for its pages to be added."""
 
-        self.drag_start_position = None  # Initialize here
-        layout = QVBoxLayout()
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.future = None
 
-        self.checkbox = QCheckBox(f"Page {page_number + 1}")
-        layout.addWidget(self.checkbox)
 
-        self.label = QLabel()
-        self.pixmap = QPixmap.fromImage(image)
-        # self.label.setPixmap(self.pixmap.scaled(200, 200, Qt.KeepAspectRatio))
-        layout.addWidget(self.label)
+class ScanSignals(QObject):
+    # Emitted from the folder scanning threads; Qt queues them onto the GUI thread
+    files_found = Signal(object, object)
+    scan_finished = Signal(object, object, object)
 
-        self.setLayout(layout)
 
-    def set_image_size(self, size):
-        rotated_pixmap = self.pixmap.transformed(QTransform().rotate(self.rotation))
-        self.label.setPixmap(rotated_pixmap.scaled(size, size, Qt.KeepAspectRatio))
+class PageThumbnail:
+    """
+    Rendered image of one page of the page list, kept by PdfPageModel while the page is near the viewport.
+    """
 
-    def rotate(self):
-        self.rotation = (self.rotation + 90) % 360
-        self.set_image_size(self.label.width())  # Refresh the image with new rotation
+    def __init__(self, record):
+        self.record = record
+        self.render_future = None  # Set while a render of this page is queued or running
 
-    def is_checked(self):
-        return self.checkbox.isChecked()
+        # The image stays None until the page scrolls near the viewport and has been rendered. It is only held
+        # until the display pixmap is built from it; after that the thumbnail cache holds the one copy, and
+        # the image is looked up there again (or rendered again) when the zoom changes.
+        self.image = None
+        self.image_tier = 0
+        self.image_rotation = 0  # Rotation the image was rendered with
+        self.pixmap = None  # The image scaled for display, built when the page is first painted
+        self.pixmap_size = 0
+        self.pixmap_rotation = 0
 
-    def update_page_number(self, new_number):
-        self.page_number = new_number  # Update the page number
-        self.checkbox.setText(f"Page {new_number}")
+    def set_image(self, image, tier, rotation):
+        self.image = image
+        self.image_tier = tier
+        self.image_rotation = rotation
+        if image is None:
+            self.pixmap = None
+        else:
+            self.pixmap_size = 0  # Keep showing the old pixmap until the new image is painted
+
+    def is_rendered(self):
+        return self.image is not None or self.pixmap is not None
+
+    def needs_render(self, tier):
+        # Sharper images are fine, they are scaled down for display
+        return not self.is_rendered() or self.image_tier < tier or self.image_rotation != self.record.rotation
+
+    def needs_image(self, size):
+        """True when the pixmap has to be built again for this size, but its image was already released."""
+        return self.image is None and self.pixmap is not None and self.pixmap_size != size
+
+    def display_pixmap(self, size):
+        rotation = self.record.rotation
+        if self.image is None:
+            if self.pixmap_rotation != rotation:
+                # Show the old pixmap turned until the rotated rendering arrives
+                self.pixmap = self.pixmap.transformed(QTransform().rotate(rotation - self.pixmap_rotation))
+                self.pixmap_rotation = rotation
+            return self.pixmap  # Possibly for another size, then it is stretched until the image is back
+
+        with instrumentation.span("scale pixmap", size=size):
+            image = self.image
+            turn = rotation - self.image_rotation  # Non-zero while the rotated rendering is on its way
+            scale = size / max(image.width(), image.height(), 1)
+            if turn:
+                # Turn and scale in one pass instead of making a full-size turned copy first
+                image = image.transformed(QTransform().rotate(turn).scale(scale, scale), Qt.SmoothTransformation)
+            elif scale != 1:
+                image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.pixmap = QPixmap.fromImage(image)
+        self.pixmap_size = size
+        self.pixmap_rotation = rotation
+        self.image = None  # Released to the thumbnail cache
+        return self.pixmap
+
+
+def display_size(record, size):
+    """Size of a page scaled to fit a size x size square, with its rotation applied."""
+    width, height = record.width, record.height
+    if record.rotation in (90, 270):
+        width, height = height, width
+    scale = size / max(width, height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class PdfPageModel(QAbstractListModel, PageListObserver):
+    """
+    Qt model over a PageList, which it observes. Views only ask for the rows they paint, and thumbnails
+    are only kept for pages that have been near the viewport.
+    """
+
+    def __init__(self, page_list, parent=None):
+        super().__init__(parent)
+        self.page_list = page_list
+        self.thumbnails = {}  # PageRecord -> PageThumbnail
+        page_list.add_observer(self)
+
+    def thumbnail(self, record):
+        thumbnail = self.thumbnails.get(record)
+        if thumbnail is None:
+            thumbnail = self.thumbnails[record] = PageThumbnail(record)
+        return thumbnail
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.page_list)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.page_list[index.row()]
+        if role == Qt.DisplayRole:
+            return f"Page {index.row() + 1}"  # Pages are numbered by position
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if record.checked else Qt.Unchecked
+        if role == PAGE_ROLE:
+            return record
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        self.page_list.set_checked(Qt.CheckState(value) == Qt.Checked, [index.row()])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled  # Pages are dropped between other pages, never onto one
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_row):
+        # Called by the view when pages are dragged
+        return self.page_list.move(source_row, count, destination_row)
+
+    def drop_rows(self, dragged_row, destination):
+        """
+        Move the dragged page in front of the page at `destination` (counted before the move). When the dragged
+        page is checked, all checked pages move along with it, in their current order.
+        """
+        rows = self.page_list.checked_rows() if self.page_list[dragged_row].checked else [dragged_row]
+        self.page_list.move_rows_to(rows, destination - sum(1 for row in rows if row < destination))
+
+    def renumbered(self, first):
+        # Rows from `first` on have a new position, and so a new page number
+        if first < len(self.page_list):
+            self.dataChanged.emit(self.index(first), self.index(len(self.page_list) - 1), [Qt.DisplayRole])
+
+    # PageListObserver
+
+    def pages_about_to_be_inserted(self, first, last):
+        self.beginInsertRows(QModelIndex(), first, last)
+
+    def pages_inserted(self, first, last):
+        self.endInsertRows()
+
+    def pages_about_to_be_removed(self, first, last):
+        self.beginRemoveRows(QModelIndex(), first, last)
+        for record in self.page_list.records[first:last + 1]:
+            self.thumbnails.pop(record, None)
+
+    def pages_removed(self, first, last):
+        self.endRemoveRows()
+        self.renumbered(first)
+
+    def pages_about_to_be_moved(self, first, last, destination):
+        self.beginMoveRows(QModelIndex(), first, last, QModelIndex(), destination)
+
+    def pages_moved(self, first, last, destination):
+        self.endMoveRows()
+        self.renumbered(min(first, destination))
+
+    def pages_changed(self, first, last):
+        self.dataChanged.emit(self.index(first), self.index(last))
+
+    def pages_about_to_be_reordered(self):
+        self.layoutAboutToBeChanged.emit()
+
+    def pages_reordered(self, new_rows):
+        # Keep the view's current and selected pages on the same pages
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(old_indexes, [self.index(new_rows[index.row()]) for index in old_indexes])
+        self.layoutChanged.emit()
+
+    def pages_about_to_be_reset(self):
+        self.beginResetModel()
+
+    def pages_reset(self):
+        self.thumbnails.clear()
+        self.endResetModel()
+
+
+class PdfPageDelegate(QStyledItemDelegate):
+    """Paints a page cell: a "Page n" checkbox above the thumbnail, or a gray placeholder until it is rendered."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image_size = 400  # Longest side of the thumbnails, in pixels
+
+    def header_height(self, widget):
+        indicator = widget.style().pixelMetric(QStyle.PM_IndicatorHeight, None, widget)
+        return max(indicator, widget.fontMetrics().height()) + 4
+
+    def cell_size(self, widget):
+        return QSize(self.image_size + 50, self.header_height(widget) + self.image_size + 3 * CELL_MARGIN)
+
+    def sizeHint(self, option, index):
+        return self.cell_size(option.widget)
+
+    def checkbox_rect(self, option):
+        rect = option.rect.adjusted(CELL_MARGIN, CELL_MARGIN, -CELL_MARGIN, 0)
+        rect.setHeight(self.header_height(option.widget))
+        return rect
+
+    def paint(self, painter, option, index):
+        record = index.data(PAGE_ROLE)
+        thumbnail = index.model().thumbnails.get(record)
+        widget = option.widget
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.setPen(QPen(option.palette.highlight().color(), 2))
+            painter.drawRect(option.rect.adjusted(1, 1, -1, -1))
+
+        checkbox = QStyleOptionButton()
+        checkbox.rect = self.checkbox_rect(option)
+        checkbox.text = index.data(Qt.DisplayRole)
+        checkbox.palette = option.palette
+        checkbox.state = QStyle.State_Enabled | (QStyle.State_On if record.checked else QStyle.State_Off)
+        widget.style().drawControl(QStyle.CE_CheckBox, checkbox, painter, widget)
+
+        width, height = display_size(record, self.image_size)
+        image_rect = QRect(option.rect.left() + CELL_MARGIN, checkbox.rect.bottom() + CELL_MARGIN, width, height)
+        if thumbnail is None or not thumbnail.is_rendered():
+            painter.fillRect(image_rect, QColor("lightgray"))  # Shown while the page is not rendered
+        else:
+            painter.drawPixmap(image_rect, thumbnail.display_pixmap(self.image_size))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        # Clicking the checkbox or its label toggles the page, like a QCheckBox
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease) and event.button() == Qt.LeftButton:
+            if self.checkbox_rect(option).contains(event.position().toPoint()):
+                if event.type() == QEvent.MouseButtonRelease:
+                    checked = index.data(Qt.CheckStateRole) == Qt.Checked
+                    model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+                return True
+        return False
+
+
+class PdfPageView(QListView):
+    """
+    Grid of page thumbnails. Only the visible cells are painted, and dragging a page moves its row in the model.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)  # Every cell has the same size, so the layout never measures all pages
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDefaultDropAction(Qt.MoveAction)
+
+    def grid_origin(self):
+        # Top left corner of the first cell in viewport coordinates, which moves with the scroll position
+        self.executeDelayedItemsLayout()
+        return self.visualRect(self.model().index(0, 0)).topLeft()
+
+    def grid_columns(self):
+        # Fixed size cells wrap as soon as the next one would not fit in the viewport
+        return max(1, self.viewport().width() // self.gridSize().width())
+
+    def row_at(self, point):
+        """Row of the cell under a viewport position, or -1, computed from the grid instead of searching the cells."""
+        rows = self.model().rowCount()
+        if not rows:
+            return -1
+        origin = self.grid_origin()
+        grid = self.gridSize()
+        column = (point.x() - origin.x()) // grid.width()
+        line = (point.y() - origin.y()) // grid.height()
+        if not 0 <= column < self.grid_columns() or line < 0:
+            return -1
+        row = line * self.grid_columns() + column
+        return row if row < rows else -1
+
+    def rows_between(self, top, bottom):
+        """Return the (first, end) range of rows whose cells overlap the band from top to bottom, in viewport coordinates."""
+        rows = self.model().rowCount()
+        if not rows:
+            return 0, 0
+        origin_y = self.grid_origin().y()
+        height = self.gridSize().height()
+        columns = self.grid_columns()
+        first_line = max(0, (top - origin_y) // height)
+        end_line = max(0, (bottom - origin_y) // height + 1)
+        return min(rows, int(first_line) * columns), min(rows, int(end_line) * columns)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton and QApplication.keyboardModifiers() == Qt.ControlModifier:
-            self.checkbox.setChecked(not self.checkbox.isChecked())
+            row = self.row_at(event.position().toPoint())
+            if row >= 0:
+                index = self.model().index(row, 0)
+                checked = index.data(Qt.CheckStateRole) == Qt.Checked
+                self.model().setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
         super().mousePressEvent(event)  # Call the parent class's mousePressEvent method
-        if event.button() == Qt.LeftButton:
-            self.drag_start_position = event.position().toPoint()
 
-    def mouseMoveEvent(self, event):
-        if not (event.buttons() & Qt.LeftButton):
+    def dropEvent(self, event):
+        if event.source() is not self or not self.currentIndex().isValid():
+            event.ignore()
             return
+        # Drop in front of the page under the cursor, or after it when the cursor is on its right half
+        point = event.position().toPoint()
+        row = self.row_at(point)
+        if row < 0:
+            destination = self.model().rowCount()
+        else:
+            destination = row + 1 if point.x() > self.visualRect(self.model().index(row, 0)).center().x() else row
+        self.model().drop_rows(self.currentIndex().row(), destination)
+        event.accept()  # The model has no removeRows, so the view does not try to remove the dragged rows afterwards
 
-        if (event.position().toPoint() - self.drag_start_position).manhattanLength() < QApplication.startDragDistance():
+    def wheelEvent(self, event):
+        if QApplication.keyboardModifiers() == Qt.ControlModifier:
+            event.ignore()  # Leave Ctrl+wheel to the window, which zooms
             return
-
-        drag = QDrag(self)
-        mimedata = QMimeData()
-        index = self.window().page_items.index(self)
-        mimedata.setText(str(index))  # Store the index of the widget
-        drag.setMimeData(mimedata)
-        drag.exec(Qt.MoveAction)
+        super().wheelEvent(event)
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.counter = 0
-        self.page_items = []
-        self.column_count = 3  # You can adjust this as needed
+        self.document_store = DocumentStore()  # Pages made from dropped images live in memory, not in temp files
+        self.page_list = PageList()  # The pages and their state; the widgets below only observe it
+        self.page_model = PdfPageModel(self.page_list, self)
+
+        # Background rendering: pages are rasterized in worker processes and delivered back through signals
+        self.render_pool = None
+        self.pending_renders = {}  # Maps each render future to the PageThumbnail waiting for it
+        self.sent_documents = set()  # In-memory sources whose bytes were sent to the render pool
+        self.thumbnail_cache = ThumbnailCache(THUMBNAIL_CACHE_BUDGET)
+        self.render_signals = RenderSignals()
+        self.render_signals.page_rendered.connect(self.on_page_rendered)
+
+        # The memory held for thumbnails, pixmaps and in-memory documents is checked shortly after renders and loads.
+        # Over budget, cached thumbnails are evicted first, then thumbnails away from the viewport, and then
+        # pages are rendered at a lower resolution until there is room again.
+        self.resolution_cap = RESOLUTION_TIERS[-1]
+        self.resolution_changed_at = 0  # time.monotonic() of the last change of resolution_cap
+        self.memory_governor = MemoryGovernor(MEMORY_BUDGET)
+        self.memory_governor.track("thumbnail cache", lambda: self.thumbnail_cache.used_bytes)
+        self.memory_governor.track("pixmaps", self.pixmap_bytes)
+        self.memory_governor.track("documents", self.document_store.used_bytes)
+        self.memory_governor.add_relief(self.evict_cached_thumbnails)
+        self.memory_governor.add_relief(self.release_offscreen_thumbnails)
+        self.memory_governor.add_relief(self.lower_resolution)
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setSingleShot(True)
+        self.memory_timer.setInterval(200)
+        self.memory_timer.timeout.connect(self.check_memory)
+
+        # Files are read in the render pool, several at once, and added in the order they were queued
+        self.pending_loads = []  # FileLoads in queue order
+        self.files_queued = 0  # Counts for the status bar, reset once the queue is empty
+        self.files_loaded = 0
+        self.load_signals = LoadSignals()
+        self.load_signals.file_read.connect(self.on_file_read)
+
+        # Folders are scanned on background threads and their PDFs loaded in batches as they are found
+        self.folder_scans = []
+        self.scanned_files = 0
+        self.scan_signals = ScanSignals()
+        self.scan_signals.files_found.connect(self.on_files_found)
+        self.scan_signals.scan_finished.connect(self.on_scan_finished)
+
+        # Only pages near the viewport get rendered; updates are batched while the user scrolls or resizes
+        self.visible_pages_timer = QTimer(self)
+        self.visible_pages_timer.setSingleShot(True)
+        self.visible_pages_timer.setInterval(50)
+        self.visible_pages_timer.timeout.connect(self.update_visible_pages)
+
+        # Exports run in their own process, which is polled for progress
+        self.export_process = None
+        self.export_messages = None
+        self.export_cancel_event = None
+        self.export_output_file = None
+        self.export_temp_file = None  # Written by the export process and renamed to the output once complete
+        self.export_timer = QTimer(self)
+        self.export_timer.setInterval(100)
+        self.export_timer.timeout.connect(self.poll_export)
 
         self.setWindowTitle("Pdf Editor")
         self.resize(1200, 800)
 
+        # Zoom in Functionallity:
+        self.zoom_level = 400
+
         # Central widget setup
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
-        self.scroll_area = QScrollArea(self.central_widget)
-        self.scroll_widget = QWidget()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setWidget(self.scroll_widget)
+        self.page_view = PdfPageView(self.central_widget)
+        self.page_delegate = PdfPageDelegate(self.page_view)
+        self.page_delegate.image_size = self.zoom_level
+        self.page_view.setItemDelegate(self.page_delegate)
+        self.page_view.setModel(self.page_model)
+        self.page_view.setGridSize(self.page_delegate.cell_size(self.page_view))
 
         self.layout = QVBoxLayout(self.central_widget)
         self.add_top_widgets()
 
-        self.layout.addWidget(self.scroll_area)
+        self.layout.addWidget(self.page_view)
         self.add_bottom_widgets()
 
-        self.grid_layout = QGridLayout(self.scroll_widget)
-
-        # Zoom in Functionallity:
-        self.zoom_level = 400
+        # Check which pages need rendering whenever the visible pages may have changed
+        self.page_view.verticalScrollBar().valueChanged.connect(lambda value: self.visible_pages_timer.start())
+        model = self.page_model
+        for signal in (model.rowsInserted, model.rowsRemoved, model.rowsMoved, model.layoutChanged, model.modelReset):
+            signal.connect(lambda *args: self.visible_pages_timer.start())
 
         # Enable drag and drop
         self.central_widget.setAcceptDrops(True)
@@ -116,16 +479,6 @@ class MainWindow(QMainWindow):
 
         # Add menu bar
         self.create_menu_bar()
-        self.delete_pdf_files("temp_files")
-
-    def delete_pdf_files(self, folder_path):
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(folder_path, filename)
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Failed to delete {file_path}. Reason: {e}")
 
     def create_menu_bar(self):
         # Create a menu bar
@@ -140,6 +493,21 @@ class MainWindow(QMainWindow):
         exit_action.triggered.connect(self.close)  # Connect to the close method of the window
         file_menu.addAction(exit_action)
 
+        # Arrange Menu, batch reordering applied as one change
+        arrange_menu = menu_bar.addMenu("&Arrange")
+        move_action = QAction("&Move Selected Pages To...", self)
+        move_action.triggered.connect(self.move_selected_pages)
+        arrange_menu.addAction(move_action)
+        reverse_action = QAction("&Reverse Pages", self)
+        reverse_action.triggered.connect(self.reverse_pages)
+        arrange_menu.addAction(reverse_action)
+        interleave_action = QAction("&Interleave Two Files...", self)
+        interleave_action.triggered.connect(self.interleave_sources)
+        arrange_menu.addAction(interleave_action)
+        sort_action = QAction("&Sort by File", self)
+        sort_action.triggered.connect(self.page_list.sort_by_source)
+        arrange_menu.addAction(sort_action)
+
         # Help Section
         help_menu = menu_bar.addMenu("&Help")
         help_action = QAction("&Usage", self)
@@ -147,9 +515,53 @@ class MainWindow(QMainWindow):
         help_menu.addAction(help_action)
 
     def show_help_message(self):
-        message = "Press Ctrl and click on a page to select its checkbox."
+        message = (
+            "Press Ctrl and click on a page to select its checkbox.\n"
+            "Dragging a selected page moves all selected pages."
+        )
         QMessageBox.information(self, "How to Use", message)
 
+    def move_selected_pages(self):
+        rows = self.page_list.checked_rows()
+        if not rows:
+            QMessageBox.warning(self, "Error", "Select the pages to move first.")
+            return
+        last_position = len(self.page_list) - len(rows) + 1
+        position, ok = QInputDialog.getInt(
+            self, "Move Selected Pages", f"Move the selected pages to position (1-{last_position}):", 1, 1, last_position
+        )
+        if ok:
+            self.page_list.move_rows_to(rows, position - 1)
+
+    def reverse_pages(self):
+        """Reverse the pages from the first to the last selected one, or the whole document when fewer are selected."""
+        rows = self.page_list.checked_rows()
+        if len(rows) >= 2:
+            self.page_list.reverse(rows[0], rows[-1])
+        elif len(self.page_list):
+            self.page_list.reverse(0, len(self.page_list) - 1)
+
+    def interleave_sources(self):
+        sources = sorted(self.page_list.sources())
+        if len(sources) < 2:
+            QMessageBox.warning(self, "Error", "Add two files to interleave first.")
+            return
+        # Several files can share a name, so the list shows the names in full when needed
+        names = [source_name(source) for source in sources]
+        labels = [name if names.count(name) == 1 else source for name, source in zip(names, sources)]
+        fronts, ok = QInputDialog.getItem(self, "Interleave Two Files", "File with the odd pages (fronts):", labels, 0, False)
+        if not ok:
+            return
+        backs, ok = QInputDialog.getItem(
+            self, "Interleave Two Files", "File with the even pages (backs):", labels, 1 if labels.index(fronts) == 0 else 0, False
+        )
+        if not ok or backs == fronts:
+            return
+        reverse = QMessageBox.question(
+            self, "Interleave Two Files", "Were the even pages scanned in reverse order (last page first)?"
+        ) == QMessageBox.Yes
+        self.page_list.interleave(sources[labels.index(fronts)], sources[labels.index(backs)], reverse)
+
     def add_top_widgets(self):
         # Create a horizontal layout for buttons
         self.buttons_layout = QHBoxLayout()
@@ -195,17 +607,18 @@ class MainWindow(QMainWindow):
         self.rotate_selected_button.clicked.connect(self.rotate_selected_pages)
         self.buttons_layout.addWidget(self.rotate_selected_button)
 
+        # Add Cancel Loading button, only enabled while pages are still rendering
+        self.cancel_loading_button = QPushButton("Cancel Loading", self.central_widget)
+        self.cancel_loading_button.clicked.connect(self.cancel_loading)
+        self.cancel_loading_button.setEnabled(False)
+        self.buttons_layout.addWidget(self.cancel_loading_button)
+
         # Add the buttons layout to the top of the main layout
         self.layout.addLayout(self.buttons_layout)
 
     def rotate_selected_pages(self):
-        for item in self.page_items:
-            if item.is_checked():
-                item.rotate()
-        self.update_grid_layout()
-        # Hacky way to make sure that they don't appear too big visually
-        self.zoom_in()
-        self.zoom_out()
+        self.page_list.rotate(self.page_list.checked_rows())
+        self.visible_pages_timer.start()  # Render the rotated pages
 
     def add_bottom_widgets(self):
         # Create a layout for output file settings
@@ -222,6 +635,15 @@ class MainWindow(QMainWindow):
         self.choose_file_button.clicked.connect(self.choose_output_file)
         self.output_file_layout.addWidget(self.choose_file_button)
 
+        # Save profile used when writing the output
+        self.save_profile_combo = QComboBox()
+        self.save_profile_combo.addItem("Fast", "fast")
+        self.save_profile_combo.addItem("Compact", "compact")
+        self.save_profile_combo.addItem("Linearized for web", "linearized")
+        self.save_profile_combo.setCurrentIndex(self.save_profile_combo.findData(DEFAULT_SAVE_PROFILE))
+        self.save_profile_combo.setToolTip("Fast saves quickest, Compact makes the smallest file, Linearized suits web viewing")
+        self.output_file_layout.addWidget(self.save_profile_combo)
+
         self.open_pdf_checkbox = QCheckBox("Open PDF after creation")
         self.output_file_layout.addWidget(self.open_pdf_checkbox)
         self.open_pdf_checkbox.setChecked(True)
@@ -239,6 +661,16 @@ class MainWindow(QMainWindow):
         self.create_all_button.clicked.connect(self.create_all_pages)
         self.create_buttons_layout.addWidget(self.create_all_button)
 
+        # Export progress, only shown while an export is running
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setVisible(False)
+        self.create_buttons_layout.addWidget(self.export_progress_bar)
+
+        self.cancel_export_button = QPushButton("Cancel Export")
+        self.cancel_export_button.clicked.connect(self.cancel_export)
+        self.cancel_export_button.setVisible(False)
+        self.create_buttons_layout.addWidget(self.cancel_export_button)
+
         # Add the create buttons layout to the main layout
         self.layout.addLayout(self.create_buttons_layout)
 
@@ -248,29 +680,93 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Please specify an output file name.")
             return
 
-        new_pdf = fitz.open()  # Create a new empty PDF
-        for item in self.page_items:
-            if selected_only and not item.is_checked():
-                continue
-            original_pdf_path, original_page_number = item.original_pdf_path, item.original_page_number
-            original_pdf = fitz.open(original_pdf_path)
-            page = original_pdf[original_page_number - 1]
-
-            # Apply rotation
-            if item.rotation != 0:
-                page.set_rotation(item.rotation)
-
-            new_pdf.insert_pdf(original_pdf, from_page=original_page_number - 1, to_page=original_page_number - 1)
-            original_pdf.close()
+        pages = self.page_list.export_pages(checked_only=selected_only)
+        if not pages:
+            QMessageBox.warning(self, "Error", "Cannot save with zero pages.")
+            return
 
         try:
-            new_pdf.save(output_file)
-            new_pdf.close()
+            temp_file = partial_file(output_file)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to create PDF: {e}")
+            return
 
-            if self.open_pdf_checkbox.isChecked():
-                self.open_pdf(output_file)
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Cannot save with zero pages.")
+        # Export in a separate process so the window stays responsive; progress comes back through a queue
+        context = multiprocessing.get_context("spawn")
+        self.export_messages = context.Queue()
+        self.export_cancel_event = context.Event()
+        profile = self.save_profile_combo.currentData()
+        memory_documents = self.document_store.subset(pdf_path for pdf_path, _, _ in pages)
+        self.export_process = context.Process(
+            target=run_export,
+            args=(pages, output_file, self.export_messages, profile, memory_documents, instrumentation.is_enabled(),
+                  self.export_cancel_event, temp_file),
+            daemon=True,
+        )
+        self.export_output_file = output_file
+        self.export_temp_file = temp_file
+        self.export_process.start()
+        self.set_exporting(True)
+        self.export_timer.start()
+
+    def set_exporting(self, exporting):
+        self.create_selected_button.setEnabled(not exporting)
+        self.create_all_button.setEnabled(not exporting)
+        self.export_progress_bar.setVisible(exporting)
+        self.cancel_export_button.setVisible(exporting)
+        if exporting:
+            self.export_progress_bar.setRange(0, 0)  # Busy indicator until the first progress message
+            self.export_progress_bar.setFormat("Starting export...")
+
+    def poll_export(self):
+        while True:
+            try:
+                stage, value, total = self.export_messages.get_nowait()
+            except queue.Empty:
+                break
+            if stage == "insert":
+                self.export_progress_bar.setRange(0, total)
+                self.export_progress_bar.setValue(value)
+                self.export_progress_bar.setFormat("Copying pages: %v / %m")
+            elif stage == "save":
+                self.export_progress_bar.setRange(0, 0)
+                self.export_progress_bar.setFormat("Saving...")
+            elif stage == "done":
+                self.finish_export()
+                if self.open_pdf_checkbox.isChecked():
+                    self.open_pdf(self.export_output_file)
+                return
+            elif stage == "trace":
+                instrumentation.add_events(value)
+            elif stage == "error":
+                self.finish_export()
+                QMessageBox.warning(self, "Error", f"Failed to create PDF: {value}")
+                return
+
+        if not self.export_process.is_alive() and self.export_messages.empty():
+            # The process died without reporting back, e.g. it ran out of memory
+            self.finish_export()
+            QMessageBox.warning(self, "Error", "The export stopped unexpectedly.")
+
+    def finish_export(self):
+        self.export_timer.stop()
+        self.export_process.join()
+        self.export_process = None
+        # Left behind only when the process was terminated or died
+        if os.path.exists(self.export_temp_file):
+            os.remove(self.export_temp_file)
+        self.set_exporting(False)
+
+    def cancel_export(self):
+        """Stop the running export and remove its unfinished output."""
+        if self.export_process is None:
+            return
+        # The export stops after its current chunk; saving is not split up, so that is cut short after a while
+        self.export_cancel_event.set()
+        self.export_process.join(EXPORT_CANCEL_TIMEOUT)
+        if self.export_process.is_alive():
+            self.export_process.terminate()
+        self.finish_export()
 
     def create_from_selected_pages(self):
         self.create_pdf(selected_only=True)
@@ -308,76 +804,64 @@ class MainWindow(QMainWindow):
             self.load_pdfs_from_folder(folder_path)
 
     def load_pdfs_from_folder(self, folder_path):
-        # Assuming you're using os.listdir, adjust if using a different method
-        import os
-        for file_name in os.listdir(folder_path):
-            if file_name.lower().endswith('.pdf'):
-                full_path = os.path.join(folder_path, file_name)
-                self.load_pdf_or_image(full_path)
+        """Load the PDFs in a folder and its subfolders, in natural order, without blocking the window."""
+        scan = FolderScan(
+            [folder_path],
+            ('.pdf',),
+            lambda files: self.scan_signals.files_found.emit(scan, files),
+            lambda count, cancelled: self.scan_signals.scan_finished.emit(scan, count, cancelled),
+        )
+        self.folder_scans.append(scan)
+        scan.start()
+        self.update_loading_status()
+
+    def on_files_found(self, scan, files):
+        if scan.is_cancelled():
+            return
+        for file_path in files:
+            self.load_pdf_or_image(file_path)
+        self.scanned_files += len(files)
+        self.update_loading_status()
+
+    def on_scan_finished(self, scan, count, cancelled):
+        self.folder_scans.remove(scan)
+        if not self.folder_scans:
+            self.scanned_files = 0
+        self.update_loading_status()
 
     def deselect_all_pages(self):
-        for item in self.page_items:
-            item.checkbox.setChecked(False)
+        self.page_list.set_checked(False)
 
     def remove_selected_pages(self):
-        self.page_items = [item for item in self.page_items if not item.is_checked()]
-        self.rearrange_grid(self.column_count)
-        self.update_page_numbers()
+        rows = self.page_list.checked_rows()
+        self.cancel_renders(self.page_model.thumbnails[record] for record in (self.page_list[row] for row in rows) if record in self.page_model.thumbnails)
+        self.page_list.remove(rows)
+        self.document_store.retain(self.page_list.sources())
+        self.sent_documents.intersection_update(self.document_store.documents)
 
     def clear_pages(self):
-        self.page_items.clear()
-        self.rearrange_grid(self.column_count)
+        self.cancel_renders(self.page_model.thumbnails.values())
+        self.page_list.clear()
+        self.document_store.retain(())
+        self.sent_documents.clear()
 
     def select_all_pages(self):
-        for item in self.page_items:
-            item.checkbox.setChecked(True)
-
-    def find_pdf_page_item_at(self, position):
-        for child in self.central_widget.findChildren(PdfPageItem):
-            if child.geometry().contains(position):
-                return child
-        return None
+        self.page_list.set_checked(True)
 
     def dropEvent(self, event):
+        # Pages dragged within the grid are handled by the view; files dropped anywhere else end up here
         mime = event.mimeData()
         if mime.hasUrls():  # Handling file drop
             for url in mime.urls():
                 if url.isLocalFile():
-                    self.load_pdf_or_image(url.toLocalFile())
-        elif mime.hasText():  # Handling internal widget drop
-            source_index = int(mime.text())
-            target_widget_pos = event.position().toPoint()
-            target_widget = self.find_pdf_page_item_at(target_widget_pos)
-            if target_widget and isinstance(target_widget, PdfPageItem):
-                target_index = self.page_items.index(target_widget)
-                if target_index != source_index:
-                    # Swap the items in self.page_items list
-                    moved_item = self.page_items.pop(source_index)
-                    self.page_items.insert(target_index, moved_item)
-
-                    # Rebuild the grid layout with the new order
-                    self.rearrange_grid(self.column_count)
-                    self.update_page_numbers()
+                    local_file = url.toLocalFile()
+                    if os.path.isdir(local_file):
+                        self.load_pdfs_from_folder(local_file)
+                    else:
+                        self.load_pdf_or_image(local_file)
 
         event.acceptProposedAction()
 
-    def find_nearest_widget_index(self, position):
-        min_distance = float('inf')
-        nearest_index = None
-
-        for i, widget in enumerate(self.page_items):
-            # Calculate the position of the widget in the grid
-            row, column = self.grid_layout.getItemPosition(i)[:2]
-            widget_pos = self.grid_layout.cellRect(row, column).center()
-
-            # Calculate the distance to the drop position
-            distance = (widget_pos - position).manhattanLength()
-            if distance < min_distance:
-                min_distance = distance
-                nearest_index = i
-
-        return nearest_index
-
     def wheelEvent(self, event):
         modifiers = QApplication.keyboardModifiers()
         if modifiers == Qt.ControlModifier:
@@ -390,231 +874,319 @@ class MainWindow(QMainWindow):
     def zoom_in(self):
         self.zoom_level += 20
         self.update_thumbnails()
-        self.update_grid_layout()
 
     def zoom_out(self):
         if self.zoom_level > 20:
             self.zoom_level -= 20
             self.update_thumbnails()
-            self.update_grid_layout()
 
     def update_thumbnails(self):
-        for i in range(self.grid_layout.count()):
-            widget = self.grid_layout.itemAt(i).widget()
-            if isinstance(widget, PdfPageItem):
-                widget.set_image_size(self.zoom_level)
+        # Scaled pixmaps are rebuilt as pages are painted, so only the visible ones are scaled right away
+        self.page_delegate.image_size = self.zoom_level
+        with instrumentation.span("layout", zoom=self.zoom_level):
+            self.page_view.setGridSize(self.page_delegate.cell_size(self.page_view))
+        self.visible_pages_timer.start()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
-        elif event.mimeData().hasText():
-            event.accept()
         else:
             event.ignore()
 
     def dragMoveEvent(self, event):
-        if event.mimeData().hasText():
+        if event.mimeData().hasUrls():
             event.accept()
         else:
             event.ignore()
 
     def load_pdf_or_image(self, file_path):
-        if file_path.lower().endswith('.pdf'):
-            self.load_pdf(file_path)
-        else:
-            self.load_image_as_pdf(file_path)
-
-    def load_image_as_pdf(self, image_path):
-        try:
-            self.counter += 1
-            # Create a new PDF document
-            pdf_doc = fitz.open()
-
-            # Create a new page with dimensions based on the image size
-            img = fitz.open(image_path)  # Open the image as a document
-            rect = img[0].rect  # The dimensions of the image
-            pdf_page = pdf_doc.new_page(width=rect.width, height=rect.height)
-
-            # Insert the image into the new page
-            pdf_page.insert_image(rect, filename=image_path)
-
-            # Save the PDF to a temporary file or in memory
-            temp_pdf = f"temp_files/{self.counter}.pdf"  # Consider using a more robust temp file approach
-            pdf_doc.save(temp_pdf)
-            pdf_doc.close()
-
-            # Now load this temporary PDF as usual
-            self.load_pdf(temp_pdf)  # Pass original image path for reference
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"{e}")
-
-    def load_pdf(self, pdf_path):
-        logging.info(f"Attempting to load PDF: {pdf_path}")
-        print(f"Attempting to load PDF: {pdf_path}")
+        """
+        Queue a PDF or image to be opened in the render pool. Several files are read at once, but their pages
+        are added in the order the files were queued.
+        """
+        logging.info(f"Attempting to load: {file_path}")
 
         # Check file size
-        file_size = os.path.getsize(pdf_path)
-        logging.debug(f"File size: {file_size / (1024 * 1024):.2f} MB")
-        print(f"File size: {file_size / (1024 * 1024):.2f} MB")
-        if file_size > 100_000_000:  # 100 MB limit, adjust as needed
-            logging.warning(f"File is too large: {file_size / (1024 * 1024):.2f} MB")
-            QMessageBox.warning(self, "Error", "File is too large to load")
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to load {file_path}: {e}")
             return
-
+        logging.debug(f"File size: {file_size / (1024 * 1024):.2f} MB")
+        if file_size > LARGE_DOCUMENT_SIZE:
+            # Only the pages near the viewport are measured and rendered, so memory does not grow with the file
+            logging.info(f"Large document: page sizes of {file_path} are read as its pages are rendered")
+
+        load = FileLoad(file_path)
+        load.future = self.submit_work(read_file, file_path)
+        self.pending_loads.append(load)
+        self.files_queued += 1
+        load.future.add_done_callback(lambda done: self.load_signals.file_read.emit(load))
+        self.update_loading_status()
+
+    def on_file_read(self, load):
+        # Add the pages of every file that is ready and not waiting behind an earlier one
+        while self.pending_loads and self.pending_loads[0].future.done():
+            load = self.pending_loads.pop(0)
+            self.files_loaded += 1
+            if not load.future.cancelled():
+                self.add_loaded_file(load)
+        if not self.pending_loads:
+            self.files_queued = self.files_loaded = 0
+        self.update_loading_status()
+
+    def add_loaded_file(self, load):
+        file_path = load.file_path
         try:
-            # Attempt to open the PDF
-            doc = fitz.open(pdf_path)
-            logging.info(f"Successfully opened {pdf_path}")
-            print(f"Successfully opened {pdf_path}")
-
-            # Log PDF information
-            logging.debug(f"Number of pages: {len(doc)}")
-            logging.debug(f"Metadata: {doc.metadata}")
-            logging.debug(f"Is encrypted: {doc.is_encrypted}")
-            logging.debug(f"Permissions: {doc.permissions}")
-            print(f"Number of pages: {len(doc)}")
-            print(f"Metadata: {doc.metadata}")
-            print(f"Is encrypted: {doc.is_encrypted}")
-            print(f"Permissions: {doc.permissions}")
-
-            # Check permissions
-            if doc.permissions <= 0:
-                logging.warning(f"Unusual permissions value ({doc.permissions}) for {pdf_path}")
-                print(f"Warning: Unusual permissions value ({doc.permissions}) for {pdf_path}")
-
-            current_count = len(self.page_items)
-            for page_num in range(len(doc)):
-                try:
-                    # Check available memory before loading each page
-                    available_memory = psutil.virtual_memory().available
-                    if available_memory < 100 * 1024 * 1024:  # 100 MB threshold
-                        logging.warning(f"Low memory warning: Only {available_memory / (1024 * 1024):.2f} MB available")
-                        print(f"Low memory warning: Only {available_memory / (1024 * 1024):.2f} MB available")
-                        QMessageBox.warning(self, "Low Memory", "Running low on memory. The application might become unstable.")
-
-                    # Load the page
-                    page = doc.load_page(page_num)
-                    logging.debug(f"Loaded page {page_num + 1}")
-                    print(f"Loaded page {page_num + 1}")
-
-                    # Create pixmap with error handling
-                    try:
-                        pix = page.get_pixmap(alpha=False)  # Disable alpha channel
-                        logging.debug(f"Created pixmap for page {page_num + 1}")
-                        print(f"Created pixmap for page {page_num + 1}")
-                    except Exception as e:
-                        logging.error(f"Error creating pixmap for page {page_num + 1}: {str(e)}")
-                        print(f"Error creating pixmap for page {page_num + 1}: {str(e)}")
-                        continue  # Skip this page and try the next one
-
-                    # Create QImage with error handling
-                    try:
-                        if pix.samples:
-                            image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-                            if image.isNull():
-                                raise ValueError(f"Created QImage is null for page {page_num + 1}")
-                            logging.debug(f"Created QImage for page {page_num + 1}")
-                            print(f"Created QImage for page {page_num + 1}")
-                        else:
-                            raise ValueError(f"Pixmap samples are null for page {page_num + 1}")
-                    except Exception as e:
-                        logging.error(f"Error creating QImage for page {page_num + 1}: {str(e)}")
-                        print(f"Error creating QImage for page {page_num + 1}: {str(e)}")
-                        continue  # Skip this page and try the next one
-
-                    # Create and add widget
-                    try:
-                        item_widget = PdfPageItem(current_count + page_num + 1, image, pdf_path, page_num + 1)
-                        self.page_items.append(item_widget)
-                        self.grid_layout.addWidget(item_widget, (current_count + page_num) // self.column_count, (current_count + page_num) % self.column_count)
-                        item_widget.set_image_size(self.zoom_level)
-                        logging.debug(f"Added widget for page {page_num + 1}")
-                        print(f"Added widget for page {page_num + 1}")
-                    except Exception as e:
-                        logging.error(f"Error adding widget for page {page_num + 1}: {str(e)}")
-                        print(f"Error adding widget for page {page_num + 1}: {str(e)}")
-
-                except Exception as e:
-                    logging.error(f"Error processing page {page_num + 1} of {pdf_path}: {str(e)}")
-                    print(f"Error processing page {page_num + 1} of {pdf_path}: {str(e)}")
-                    QMessageBox.warning(self, "Error", f"Failed to process page {page_num + 1}: {str(e)}")
-
-            # Close the document
-            doc.close()
-            self.update_page_numbers()
-            self.update_grid_layout()
-            logging.info(f"Successfully loaded all pages from {pdf_path}")
-            print(f"Successfully loaded all pages from {pdf_path}")
-
+            pdf_data, page_sizes = self.work_result(load.future)
         except fitz.FileDataError as e:
-            logging.error(f"PyMuPDF FileDataError for {pdf_path}: {str(e)}")
-            print(f"PyMuPDF FileDataError for {pdf_path}: {str(e)}")
+            logging.error(f"PyMuPDF FileDataError for {file_path}: {str(e)}")
             QMessageBox.warning(self, "Error", f"Failed to load PDF: {str(e)}")
+            return
         except MemoryError:
-            logging.error(f"MemoryError while loading {pdf_path}")
-            print(f"MemoryError while loading {pdf_path}")
+            logging.error(f"MemoryError while loading {file_path}")
             QMessageBox.warning(self, "Error", "Not enough memory to load this PDF")
+            return
         except Exception as e:
-            logging.error(f"Unexpected error loading {pdf_path}: {str(e)}")
-            print(f"Unexpected error loading {pdf_path}: {str(e)}")
+            logging.error(f"Unexpected error loading {file_path}: {str(e)}")
             QMessageBox.warning(self, "Error", f"An unexpected error occurred: {str(e)}")
+            return
 
-        # Add a final check to see if any pages were successfully loaded
-        if not self.page_items:
-            logging.warning(f"No pages were successfully loaded from {pdf_path}")
-            print(f"No pages were successfully loaded from {pdf_path}")
+        if not page_sizes:
+            logging.warning(f"No pages were successfully loaded from {file_path}")
             QMessageBox.warning(self, "Warning", "No pages were successfully loaded from the PDF.")
+            return
+
+        # Pages made from images live in memory, not in temp files
+        source = file_path if pdf_data is None else self.document_store.add(os.path.basename(file_path), pdf_data)
+        with instrumentation.span("insert", file=file_path, pages=len(page_sizes)):
+            self.page_list.add_pages(source, page_sizes)
+        self.memory_timer.start()
+        logging.info(f"Successfully loaded {len(page_sizes)} pages from {file_path}")
+
+    def get_render_pool(self):
+        # Created on first use; spawn keeps the workers free of the GUI process state
+        if self.render_pool is None:
+            self.render_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(THUMBNAIL_DISK_CACHE_DIR, THUMBNAIL_DISK_CACHE_BUDGET),
+            )
+        return self.render_pool
+
+    def submit_work(self, function, *args):
+        """Run function(*args) in the render pool, bringing its timing spans back when tracing."""
+        if instrumentation.is_enabled():
+            return self.get_render_pool().submit(instrumentation.traced_call, function, *args)
+        return self.get_render_pool().submit(function, *args)
+
+    def work_result(self, future):
+        result = future.result()
+        return instrumentation.untrace(result) if instrumentation.is_enabled() else result
+
+    def thumbnail_tier(self):
+        return min(resolution_tier(self.zoom_level), self.resolution_cap)
+
+    def pixmap_bytes(self, thumbnails=None):
+        if thumbnails is None:
+            thumbnails = self.page_model.thumbnails.values()
+        return sum(
+            thumbnail.pixmap.width() * thumbnail.pixmap.height() * thumbnail.pixmap.depth() // 8
+            for thumbnail in thumbnails if thumbnail.pixmap is not None
+        )
+
+    def evict_cached_thumbnails(self, excess):
+        used = self.thumbnail_cache.used_bytes
+        self.thumbnail_cache.evict(used - excess)
+        return used - self.thumbnail_cache.used_bytes
+
+    def release_offscreen_thumbnails(self, excess):
+        # Only keep the pages that are rendered ahead of time, not the wider range kept for scrolling back
+        height = self.page_view.viewport().height()
+        render_first, render_end = self.page_view.rows_between(-height * RENDER_MARGIN, height * (1 + RENDER_MARGIN))
+        keep = set(self.page_list.records[render_first:render_end])
+        released = [self.page_model.thumbnails.pop(record) for record in list(self.page_model.thumbnails) if record not in keep]
+        self.cancel_renders(released)
+        return self.pixmap_bytes(released)
+
+    def lower_resolution(self, excess):
+        """Render pages one resolution tier lower from now on and drop the sharper images shown so far."""
+        lower_tiers = [tier for tier in RESOLUTION_TIERS if tier < self.thumbnail_tier()]
+        if not lower_tiers:
+            return 0
+        self.resolution_cap = lower_tiers[-1]
+        self.resolution_changed_at = time.monotonic()
+        dropped = [thumbnail for thumbnail in self.page_model.thumbnails.values() if thumbnail.image_tier > self.resolution_cap]
+        freed = self.pixmap_bytes(dropped)
+        for thumbnail in dropped:
+            thumbnail.set_image(None, 0, 0)
+        logging.warning(f"Over the memory budget, rendering pages at {self.resolution_cap} pixels")
+        self.visible_pages_timer.start()
+        return freed
+
+    def check_memory(self):
+        used = self.memory_governor.check()
+        # A tier up takes about four times the memory, so only go back up with room for that and some to spare,
+        # and not until the last change has settled, so the cap does not swing between two tiers
+        settled = time.monotonic() - self.resolution_changed_at >= RESOLUTION_RAISE_DELAY
+        if settled and used < self.memory_governor.budget() // 8 and self.resolution_cap < RESOLUTION_TIERS[-1]:
+            self.resolution_cap = RESOLUTION_TIERS[RESOLUTION_TIERS.index(self.resolution_cap) + 1]
+            self.resolution_changed_at = time.monotonic()
+            self.visible_pages_timer.start()
+        self.update_loading_status()
+
+    def submit_render(self, thumbnail, tier, send_data=False):
+        """
+        Render a page in the pool. The bytes of an in-memory source go along with its first render only;
+        a worker that does not have the document open yet asks for them again (see on_page_rendered).
+        """
+        record = thumbnail.record
+        key = (record.source, record.page_index, record.rotation, tier)
+        data = self.document_store.get(record.source)
+        if data is not None and (send_data or record.source not in self.sent_documents):
+            self.sent_documents.add(record.source)
+        else:
+            data = None
+        future = self.submit_work(
+            render_page, record.source, record.page_index, tier, record.rotation, data,
+            self.document_store.fingerprint(record.source),
+        )
+        self.pending_renders[future] = thumbnail
+        thumbnail.render_future = future
+        future.add_done_callback(lambda done: self.render_signals.page_rendered.emit(thumbnail, key, done))
+
+    def show_thumbnail(self, thumbnail, tier):
+        """Show the nearest cached resolution right away and render the wanted one if it is missing."""
+        record = thumbnail.record
+        cached = self.thumbnail_cache.lookup(record.source, record.page_index, record.rotation, tier)
+        if cached is not None:
+            cached_tier, image = cached
+            if thumbnail.needs_render(cached_tier) or thumbnail.needs_image(self.zoom_level):
+                thumbnail.set_image(image, cached_tier, record.rotation)
+        if (thumbnail.needs_render(tier) or thumbnail.needs_image(self.zoom_level)) and thumbnail.render_future is None:
+            self.submit_render(thumbnail, tier)
+
+    def update_visible_pages(self):
+        """Render the pages in or near the viewport and drop the thumbnails of pages far away from it."""
+        with instrumentation.span("visible pages"):
+            height = self.page_view.viewport().height()
+            render_first, render_end = self.page_view.rows_between(-height * RENDER_MARGIN, height * (1 + RENDER_MARGIN))
+            keep_first, keep_end = self.page_view.rows_between(-height * KEEP_MARGIN, height * (1 + KEEP_MARGIN))
+
+            tier = self.thumbnail_tier()
+            for record in self.page_list.records[render_first:render_end]:
+                thumbnail = self.page_model.thumbnail(record)
+                if thumbnail.needs_render(tier) or thumbnail.needs_image(self.zoom_level):
+                    self.show_thumbnail(thumbnail, tier)
+
+            # Only pages that have a thumbnail need checking, not the whole list
+            keep = set(self.page_list.records[keep_first:keep_end])
+            far_away = [record for record in self.page_model.thumbnails if record not in keep]
+            self.cancel_renders(self.page_model.thumbnails.pop(record) for record in far_away)
+            self.page_view.viewport().update()  # Cached thumbnails may have been shown
+
+    def on_page_rendered(self, thumbnail, key, future):
+        if self.pending_renders.pop(future, None) is None or future.cancelled():
+            return  # Cancelled, or the page was removed while it was rendering
+        thumbnail.render_future = None
+
+        record = thumbnail.record
+        page_num = record.page_index + 1
+        try:
+            try:
+                width, height, stride, samples = self.work_result(future)
+            except DocumentNotLoaded:
+                self.submit_render(thumbnail, key[3], send_data=True)
+                return
+            with instrumentation.span("QImage conversion", page=page_num):
+                # Wraps the received buffer without copying it; PySide keeps the buffer alive with the image
+                image = QImage(samples, width, height, stride, QImage.Format_RGB888)
+            if image.isNull():
+                raise ValueError(f"Created QImage is null for page {page_num}")
+            _, _, rotation, tier = key
+            self.correct_page_size(record, width, height, rotation)
+            self.thumbnail_cache.put(key, image, image.sizeInBytes())
+            self.memory_timer.start()
+            if rotation == record.rotation and (thumbnail.needs_render(tier) or thumbnail.needs_image(self.zoom_level)):
+                thumbnail.set_image(image, tier, rotation)
+                self.page_view.viewport().update()  # Repaints the visible cells only
+            if thumbnail.needs_render(self.thumbnail_tier()):
+                self.visible_pages_timer.start()  # Zoom or rotation changed while this was rendering
+            logging.debug(f"Created QImage for page {page_num}")
+        except Exception as e:
+            # Skip pages that fail to render, as before
+            logging.error(f"Error rendering page {page_num} of {record.source}: {str(e)}")
+            self.page_list.remove([self.page_list.row_of(record)])
+        self.update_loading_status()
+
+    def correct_page_size(self, record, width, height, rotation):
+        # Pages of large documents start out with the size of their first page
+        if rotation in (90, 270):
+            width, height = height, width
+        if abs(width / height - record.width / max(record.height, 1)) > 0.01:
+            scale = max(record.width, record.height) / max(width, height)
+            self.page_list.set_size(self.page_list.row_of(record), width * scale, height * scale)
+
+    def update_loading_status(self):
+        remaining = len(self.pending_renders)
+        self.cancel_loading_button.setEnabled(remaining > 0 or bool(self.folder_scans) or bool(self.pending_loads))
+        if self.folder_scans:
+            self.statusBar().showMessage(f"Scanning folders: {self.scanned_files} PDFs found")
+        elif self.pending_loads:
+            self.statusBar().showMessage(
+                f"Loading files: {self.files_loaded} of {self.files_queued} done, "
+                f"{source_name(self.pending_loads[0].file_path)} next"
+            )
+        elif remaining:
+            self.statusBar().showMessage(f"Rendering pages: {remaining} remaining")
+        elif self.resolution_cap < resolution_tier(self.zoom_level):
+            self.statusBar().showMessage("Low on memory: pages are shown at a lower resolution")
+        else:
+            self.statusBar().clearMessage()
+
+    def cancel_renders(self, thumbnails):
+        for thumbnail in thumbnails:
+            future = thumbnail.render_future
+            if future is not None:
+                thumbnail.render_future = None
+                del self.pending_renders[future]  # Forget it first, cancel() runs the done callback right away
+                future.cancel()
+        self.update_loading_status()
+
+    def cancel_loading(self):
+        """
+        Stop folder scans, files not read yet and queued renders; the pages stay as placeholders until they are
+        scrolled into view again.
+        """
+        for scan in self.folder_scans:
+            scan.cancel()
+        for load in list(self.pending_loads):
+            load.future.cancel()  # Files already being read are still added
+        self.cancel_renders(list(self.pending_renders.values()))
 
     def resizeEvent(self, event):
         QMainWindow.resizeEvent(self, event)
-        # Dynamically calculate the number of columns
-        self.column_count = self.calculate_column_count()
-        self.update_grid_layout()
-
-    def update_grid_layout(self):
-        # Determine the number of columns based on window width and zoom level
-        self.column_count = self.calculate_column_count()
-        self.rearrange_grid(self.column_count)
-
-    def calculate_column_count(self):
-        window_width = self.scroll_widget.width()
-        item_width = self.zoom_level + 50  # or self.zoom_level + some padding
-        return max(1, window_width // item_width)
-
-    def rearrange_grid(self, column_count):
-        # Clear the layout
-        for i in reversed(range(self.grid_layout.count())):
-            self.grid_layout.itemAt(i).widget().setParent(None)
-
-        # Re-add widgets in the new order
-        row = column = 0
-        for widget in self.page_items:
-            self.grid_layout.addWidget(widget, row, column)
-            column += 1
-            if column >= column_count:
-                column = 0
-                row += 1
-
-    def update_page_numbers(self):
-        for i, widget in enumerate(self.page_items):
-            widget.update_page_number(i + 1)
+        # The view lays the pages out again for the new width, which may bring other pages into view
+        self.visible_pages_timer.start()
 
     def closeEvent(self, event):
-        """Override closeEvent to clean up temp files before closing."""
-        self.cleanup_temp_files()
+        """Override closeEvent to stop background work before closing."""
+        for scan in self.folder_scans:
+            scan.cancel()
+        if self.render_pool is not None:
+            self.render_pool.shutdown(wait=False, cancel_futures=True)
+        self.cancel_export()
         super().closeEvent(event)
 
-    def cleanup_temp_files(self):
-        """Remove the temp_files directory and its contents."""
-        try:
-            shutil.rmtree("temp_files")
-            logging.info(f"Successfully removed temp files directory.")
-        except Exception as e:
-            logging.error(f"Failed to remove temp_files directory: {str(e)}")
-
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for the render pool in frozen executables
+    trace_file = instrumentation.enable_from_environment()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if trace_file:
+        instrumentation.write(trace_file)
+    sys.exit(exit_code)
@@ -0,0 +1,167 @@
+import os
+import tempfile
+
+import fitz  # PyMuPDF
+
+import instrumentation
+from document_store import open_document
+
+# Export engine shared by the editor and the command line tools.
+
+# Keyword arguments passed to Document.save for each output profile
+SAVE_PROFILES = {
+    # Write the objects as they are, quickest to save
+    "fast": {},
+    # Drop unused objects, merge identical ones (fonts and images shared between merged sources
+    # included), compress every stream and pack small objects into object streams
+    "compact": {"garbage": 4, "deflate": True, "deflate_images": True, "deflate_fonts": True, "use_objstms": True},
+    # Linearized ("fast web view") so viewers can show the first page before the whole file is downloaded
+    "linearized": {"garbage": 4, "deflate": True, "linear": True},
+}
+DEFAULT_SAVE_PROFILE = "fast"
+# mkstemp creates files only the owner can read; outputs get the permissions a new file would have instead
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+EXPORT_CHUNK_PAGES = 32  # Pages copied per insert, so progress and cancellation are checked during long ranges
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled between two chunks."""
+
+
+def page_ranges(pages):
+    """
+    Group (pdf_path, page_index, rotation) entries into runs of consecutive pages from the same source.
+    Yields (pdf_path, from_index, to_index, rotations), where runs may also go backwards (to_index < from_index).
+    """
+    run = None
+    for pdf_path, page_index, rotation in pages:
+        if run is not None and run[0] == pdf_path:
+            step = page_index - run[2]
+            # A single page run can grow either way, after that the run keeps its direction
+            if step in (1, -1) and (run[1] == run[2] or step == (1 if run[2] > run[1] else -1)):
+                run[2] = page_index
+                run[3].append(rotation)
+                continue
+        if run is not None:
+            yield tuple(run)
+        run = [pdf_path, page_index, page_index, [rotation]]
+    if run is not None:
+        yield tuple(run)
+
+
+def build_document(pages, progress=None, memory_documents=None, cancelled=None):
+    """
+    Build a new PDF from (pdf_path, page_index, rotation) entries, where rotation is added to the page's own.
+    pdf_path may also be the key of an in-memory PDF in memory_documents.
+    Every source is opened once and copied range by range, in chunks of EXPORT_CHUNK_PAGES pages. Its graft map
+    is kept until its last chunk, so fonts and images shared between its pages are only copied into the output once.
+    progress(pages_done, total_pages) is called after every chunk, and ExportCancelled is raised there once
+    cancelled() returns True.
+    """
+    pages = list(pages)
+    ranges = list(page_ranges(pages))
+    last_range = {pdf_path: i for i, (pdf_path, *_) in enumerate(ranges)}
+
+    new_pdf = fitz.open()  # Create a new empty PDF
+    sources = {}
+    try:
+        for i, (pdf_path, from_index, to_index, rotations) in enumerate(ranges):
+            source = sources.get(pdf_path)
+            if source is None:
+                source = sources[pdf_path] = open_document(pdf_path, memory_documents)
+            step = 1 if to_index >= from_index else -1
+            for chunk_start in range(0, len(rotations), EXPORT_CHUNK_PAGES):
+                chunk_rotations = rotations[chunk_start:chunk_start + EXPORT_CHUNK_PAGES]
+                first = from_index + chunk_start * step
+                last = first + (len(chunk_rotations) - 1) * step
+                final = last_range[pdf_path] == i and chunk_start + EXPORT_CHUNK_PAGES >= len(rotations)
+                start = len(new_pdf)
+                with instrumentation.span("insert", pages=len(chunk_rotations)):
+                    new_pdf.insert_pdf(source, from_page=first, to_page=last, final=final)
+
+                # Apply rotation on top of the rotation the page already has
+                for offset, rotation in enumerate(chunk_rotations):
+                    if rotation:
+                        page = new_pdf[start + offset]
+                        page.set_rotation((page.rotation + rotation) % 360)
+
+                if progress is not None:
+                    progress(len(new_pdf), len(pages))
+                if cancelled is not None and cancelled():
+                    raise ExportCancelled("The export was cancelled.")
+    except Exception:
+        new_pdf.close()
+        raise
+    finally:
+        for source in sources.values():
+            source.close()
+    return new_pdf
+
+
+def partial_file(output_file):
+    """
+    Create an empty file next to the output to write it to, before it is renamed to the output once complete.
+    Every call gets a file of its own, so jobs writing the same output never write to one file.
+    """
+    folder = os.path.dirname(os.path.abspath(output_file))
+    fd, temp_file = tempfile.mkstemp(suffix=".part", prefix=os.path.basename(output_file) + ".", dir=folder)
+    os.close(fd)
+    os.chmod(temp_file, 0o666 & ~_UMASK)
+    return temp_file
+
+
+def export_pages(pages, output_file, progress=None, profile=DEFAULT_SAVE_PROFILE, memory_documents=None,
+                 cancelled=None, temp_file=None):
+    """
+    Write the given (pdf_path, page_index, rotation) pages to output_file, using one of the SAVE_PROFILES.
+    The file is saved to temp_file (by default a new partial_file) first and only renamed once complete,
+    so an interrupted export never leaves a partial output file behind.
+    progress(stage, done, total) is called with stage "insert" while pages are copied and "save" before saving.
+    Raises ValueError when there are no pages to save, and ExportCancelled when cancelled() (see build_document)
+    returned True.
+    """
+    save_options = SAVE_PROFILES[profile]
+    insert_progress = None if progress is None else lambda done, total: progress("insert", done, total)
+    if temp_file is None:
+        temp_file = partial_file(output_file)
+    try:
+        new_pdf = build_document(pages, insert_progress, memory_documents, cancelled)
+        if progress is not None:
+            progress("save", len(new_pdf), len(new_pdf))
+        try:
+            with instrumentation.span("save", pages=len(new_pdf), profile=profile):
+                new_pdf.save(temp_file, **save_options)
+        finally:
+            new_pdf.close()
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def run_export(pages, output_file, messages, profile=DEFAULT_SAVE_PROFILE, memory_documents=None, trace=False,
+               cancel_event=None, temp_file=None):
+    """
+    Entry point of the export process: runs export_pages and reports back through the `messages` queue
+    as ("insert" or "save", done, total) tuples, followed by ("done", None, None), ("cancelled", None, None)
+    or ("error", message, None). Setting cancel_event stops the export after the current chunk.
+    temp_file is the partial_file to save to, so the caller can remove it should it have to stop the process.
+    With trace, the timing spans (see instrumentation) are sent as ("trace", spans, None) before that.
+    """
+    instrumentation.enable(trace)
+    cancelled = None if cancel_event is None else cancel_event.is_set
+    try:
+        export_pages(
+            pages, output_file, lambda stage, done, total: messages.put((stage, done, total)), profile, memory_documents,
+            cancelled, temp_file,
+        )
+        result = ("done", None, None)
+    except ExportCancelled:
+        result = ("cancelled", None, None)
+    except Exception as e:
+        result = ("error", str(e), None)
+    if trace:
+        messages.put(("trace", instrumentation.take_events(), None))
+    messages.put(result)
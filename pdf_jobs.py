@@ -0,0 +1,212 @@
+import json
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from folder_scanner import scan_paths
+from image_pdf_converter import ImagePDFConverter
+from pdf_exporter import DEFAULT_SAVE_PROFILE, SAVE_PROFILES, export_pages
+
+# Merge and export jobs that run without a GUI, used by pdf_cli.
+#
+# A job is a dict:
+#   {"type": "merge", "output": "out.pdf", "inputs": ["scan.jpg", "folder", "report.pdf"]}
+#   {"type": "export", "output": "out.pdf", "profile": "compact",
+#    "pages": ["a.pdf", "b.pdf#1-3,7", {"source": "c.pdf", "pages": "2", "rotation": 90}]}
+# "name" is optional and only used in the summary.
+
+MERGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.pdf')
+
+
+class JobError(ValueError):
+    """A job description that cannot be run."""
+
+
+def parse_page_ranges(text, page_count):
+    """
+    Turn a page selection like "1-3,5,8-" (1-based and inclusive) into zero-based page indexes.
+    An empty selection means every page, a missing bound means the first or last page and ranges
+    may run backwards ("5-1").
+    """
+    if not text.strip():
+        return list(range(page_count))
+    indexes = []
+    for part in text.split(","):
+        if not part.strip():
+            raise JobError(f"Invalid page range: {text.strip()!r}")  # An empty item, as in "1,,3"
+        start, dash, end = part.strip().partition("-")
+        try:
+            first = int(start) if start.strip() else 1
+            last = (int(end) if end.strip() else page_count) if dash else first
+        except ValueError:
+            raise JobError(f"Invalid page range: {part.strip()!r}")
+        if not (1 <= first <= page_count and 1 <= last <= page_count):
+            raise JobError(f"Page range {part.strip()!r} is outside pages 1-{page_count}")
+        step = 1 if last >= first else -1
+        indexes.extend(range(first - 1, last - 1 + step, step))
+    return indexes
+
+
+def parse_page_spec(spec):
+    """
+    Turn "file.pdf", "file.pdf#1-3" or "file.pdf#1-3@90" into {"source", "pages", "rotation"}.
+    """
+    source, _, selection = spec.partition("#")
+    pages, _, rotation = selection.partition("@")
+    return {"source": source, "pages": pages, "rotation": rotation or 0}
+
+
+def expand_merge_inputs(inputs):
+    """
+    Replace folders by the files in them that can be merged, like dropping a folder on the merger.
+    Raises JobError for inputs that do not exist.
+    """
+    files = []
+    for path in inputs:
+        if not os.path.exists(path):
+            raise JobError(f"{path} does not exist")
+        if os.path.isdir(path):
+            files.extend(scan_paths([path], MERGE_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def normalize_job(job, base_dir=""):
+    """
+    Check a job and return a copy with paths resolved against base_dir (the manifest's folder).
+    Raises JobError when the job is incomplete or a value has the wrong type.
+    """
+    if not isinstance(job, dict):
+        raise JobError(f"A job must be an object, not {type(job).__name__}")
+    job_type = job.get("type", "merge")
+    output = job.get("output")
+    if not output:
+        raise JobError("Every job needs an \"output\" file")
+    if not isinstance(output, str):
+        raise JobError(f"\"output\" must be a file name, not {output!r}")
+    normalized = {"type": job_type, "name": job.get("name") or os.path.basename(output),
+                  "output": os.path.join(base_dir, output)}
+
+    if job_type == "merge":
+        inputs = job.get("inputs")
+        if not inputs:
+            raise JobError(f"Merge job {normalized['name']} has no \"inputs\"")
+        if not isinstance(inputs, list) or not all(isinstance(path, str) for path in inputs):
+            raise JobError(f"The \"inputs\" of merge job {normalized['name']} must be a list of paths")
+        normalized["inputs"] = [os.path.join(base_dir, path) for path in inputs]
+        normalized["workers"] = job.get("workers")
+        if normalized["workers"] is not None and (type(normalized["workers"]) is not int or normalized["workers"] < 1):
+            raise JobError(f"\"workers\" must be a positive number, not {normalized['workers']!r}")
+    elif job_type == "export":
+        entries = job.get("pages")
+        if not entries:
+            raise JobError(f"Export job {normalized['name']} has no \"pages\"")
+        if not isinstance(entries, list):
+            raise JobError(f"The \"pages\" of export job {normalized['name']} must be a list")
+        pages = []
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = parse_page_spec(entry)
+            elif not isinstance(entry, dict):
+                raise JobError(f"A page entry must be a string or an object, not {entry!r}")
+            if not entry.get("source"):
+                raise JobError(f"Export job {normalized['name']} has a page entry without a \"source\"")
+            if not isinstance(entry["source"], str) or not isinstance(entry.get("pages") or "", (str, int)):
+                raise JobError(f"Invalid page entry: {entry!r}")
+            try:
+                rotation = int(entry.get("rotation") or 0)
+            except (TypeError, ValueError):
+                raise JobError(f"Invalid rotation: {entry.get('rotation')!r}")
+            if rotation % 90:
+                raise JobError(f"Rotation must be a multiple of 90 degrees, not {rotation}")
+            pages.append({"source": os.path.join(base_dir, entry["source"]), "pages": str(entry.get("pages") or ""),
+                          "rotation": rotation % 360})
+        normalized["pages"] = pages
+        normalized["profile"] = job.get("profile", DEFAULT_SAVE_PROFILE)
+        if not isinstance(normalized["profile"], str) or normalized["profile"] not in SAVE_PROFILES:
+            raise JobError(f"Unknown profile {normalized['profile']!r}, use one of {', '.join(SAVE_PROFILES)}")
+    else:
+        raise JobError(f"Unknown job type {job_type!r}, use \"merge\" or \"export\"")
+    return normalized
+
+
+def output_key(path):
+    """Compare outputs by this, so "out.pdf" and "./OUT.pdf" are one file where names ignore case."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def check_outputs(jobs):
+    """Raise JobError when two jobs write the same output file, as they would replace each other's result."""
+    seen = set()
+    for job in jobs:
+        output = output_key(job["output"])
+        if output in seen:
+            raise JobError(f"More than one job writes {job['output']}")
+        seen.add(output)
+
+
+def load_manifest(path):
+    """
+    Read the jobs of a JSON or YAML manifest, either a list of jobs or an object with a "jobs" list.
+    Relative paths in the jobs are relative to the manifest. YAML needs PyYAML.
+    Raises JobError when a job is invalid or two jobs write the same output.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise JobError("Reading YAML manifests needs PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise JobError(f"{path} is not valid JSON: {e}")
+    jobs = data.get("jobs") if isinstance(data, dict) else data
+    if not isinstance(jobs, list):
+        raise JobError(f"{path} has no list of jobs")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = [normalize_job(job, base_dir) for job in jobs]
+    check_outputs(jobs)
+    return jobs
+
+
+def export_job_pages(pages):
+    """Turn the page entries of an export job into the (source, page_index, rotation) entries export_pages takes."""
+    selected = []
+    page_counts = {}
+    for entry in pages:
+        source = entry["source"]
+        if source not in page_counts:
+            with fitz.open(source) as doc:
+                page_counts[source] = len(doc)
+        selected.extend((source, index, entry["rotation"]) for index in parse_page_ranges(entry["pages"], page_counts[source]))
+    return selected
+
+
+def run_job(job, image_workers=None, open_reader=None):
+    """
+    Run a normalized job. Never raises: returns {"name", "output", "status" ("ok" or "failed"), "seconds", "message"}.
+    open_reader optionally provides parsed PdfReaders for the PDF inputs of merges, see job_queue.
+    """
+    start = time.perf_counter()
+    try:
+        if job["type"] == "merge":
+            converter = ImagePDFConverter(
+                expand_merge_inputs(job["inputs"]), job["output"], job.get("workers") or image_workers, open_reader
+            )
+            message = " ".join(converter.convert().split("\n")).strip()
+        else:
+            pages = export_job_pages(job["pages"])
+            if not pages:
+                raise JobError("Cannot save with zero pages.")
+            export_pages(pages, job["output"], profile=job["profile"])
+            message = f"Saved {len(pages)} page(s) to {job['output']}."
+        status = "ok"
+    except Exception as e:
+        status, message = "failed", str(e) or type(e).__name__
+    return {"name": job["name"], "output": job["output"], "status": status,
+            "seconds": round(time.perf_counter() - start, 3), "message": message}
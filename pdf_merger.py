@@ -1,73 +1,32 @@
+import multiprocessing
 import os
 import subprocess
 import sys
 from PySide6.QtWidgets import (QApplication, QMainWindow, QListWidget, QVBoxLayout, QWidget,
-                               QMessageBox, QMenuBar, QFileDialog, QPushButton, QLineEdit, QLabel, QHBoxLayout, QAbstractItemView, QCheckBox)
+                               QMessageBox, QMenuBar, QFileDialog, QPushButton, QLineEdit, QLabel, QHBoxLayout, QAbstractItemView, QCheckBox,
+                               QListWidgetItem)
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QAction
-from PySide6.QtCore import QEvent, Qt
+from PySide6.QtCore import Qt, QObject, Signal, QTimer
 import os
-from PIL import Image
-from PyPDF2 import PdfReader, PdfWriter
-import tempfile
-
-
-class ImagePDFConverter:
-    def __init__(self, file_list, output_file):
-        self.file_list = file_list  # Expect a list of file paths
-        self.output_file = output_file
-
-    def convert(self):
-        # Initialize a list to hold PIL images and a PdfFileWriter object
-        images = []
-        pdf_writer = PdfWriter()
-
-        # Process images and PDFs in the file list
-        for file_path in self.file_list:
-            if file_path == self.output_file:
-                continue
-
-            filename = os.path.basename(file_path)
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                image = Image.open(file_path).convert('RGB')
-                images.append(image)
-            elif filename.lower().endswith('.pdf'):
-                pdf_reader = PdfReader(file_path)
-                for page in pdf_reader.pages:
-                    pdf_writer.add_page(page)
-
-        # Save all images to a temporary PDF if there are any
-        if images:
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                images[0].save(
-                    tmp.name,
-                    save_all=True,
-                    append_images=images[1:],
-                    quality=100,
-                    resolution=100.0
-                )
-                tmp.close()
-
-                temp_pdf_reader = PdfReader(tmp.name)
-                for page in temp_pdf_reader.pages:
-                    pdf_writer.add_page(page)
-
-                os.unlink(tmp.name)
-
-        # Write the final PDF to the output file
-        with open(self.output_file, "wb") as f:
-            pdf_writer.write(f)
-
-        # Print success messages
-        num_images = len(images)
-        num_pdfs = len(pdf_writer.pages)
-        status = ""
-        if num_images > 0:
-            status += f'Successfully converted {num_images} image(s) to PDF.'
-        if num_pdfs > 0:
-            status += f'\nSuccessfully combined {num_pdfs} page(s) into {self.output_file}.'
-        if num_images == 0 and num_pdfs == 0:
-            status += f'No images or PDF files found in the provided file list!'
-        return status
+
+from folder_scanner import FolderScan, split_patterns
+from image_pdf_converter import ImagePDFConverter
+from job_queue import JobQueue
+from pdf_jobs import MERGE_EXTENSIONS, JobError, normalize_job
+
+QUEUE_WORKERS = None  # Queued jobs that run at the same time; None uses one per core
+
+
+class ScanSignals(QObject):
+    # Emitted from the folder scanning threads; Qt queues them onto the GUI thread
+    scan_started = Signal(object)
+    files_found = Signal(object, object)
+    scan_finished = Signal(object, object, object)
+
+
+class JobSignals(QObject):
+    # Emitted from the job queue's callback thread; Qt queues it onto the GUI thread
+    job_finished = Signal(object, object)
 
 
 class ReorderableListWidget(QListWidget):
@@ -76,6 +35,42 @@ class ReorderableListWidget(QListWidget):
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.InternalMove)
 
+        # Folders are scanned in the background and their files added in batches as they are found
+        self.include_patterns = []  # Globs the files found in folders must match, if any
+        self.exclude_patterns = []  # Globs of files and folders to skip
+        self.scans = []
+        self.scan_signals = ScanSignals()
+        self.scan_signals.files_found.connect(self.add_scanned_files)
+        self.scan_signals.scan_finished.connect(self.finish_scan)
+
+    def scan(self, paths):
+        """Add the convertible files among paths, searching folders recursively without blocking the window."""
+        scan = FolderScan(
+            paths,
+            MERGE_EXTENSIONS,
+            lambda files: self.scan_signals.files_found.emit(scan, files),
+            lambda count, cancelled: self.scan_signals.scan_finished.emit(scan, count, cancelled),
+            self.include_patterns,
+            self.exclude_patterns,
+        )
+        self.scans.append(scan)
+        scan.start()
+        self.scan_signals.scan_started.emit(scan)
+
+    def add_scanned_files(self, scan, files):
+        if not scan.is_cancelled():
+            self.addItems(files)
+
+    def finish_scan(self, scan, count, cancelled):
+        self.scans.remove(scan)
+
+    def is_scanning(self):
+        return bool(self.scans)
+
+    def cancel_scans(self):
+        for scan in self.scans:
+            scan.cancel()
+
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
@@ -90,20 +85,8 @@ class ReorderableListWidget(QListWidget):
 
     def dropEvent(self, event: QDropEvent):
         if event.mimeData().hasUrls():
-            for url in event.mimeData().urls():
-                if url.isLocalFile():
-                    local_file = url.toLocalFile()
-                    if os.path.isdir(local_file):
-                        # It's a directory, so list all files and filter by extension
-                        for root, dirs, files in os.walk(local_file):
-                            for file in files:
-                                if file.lower().endswith(('.png', '.jpg', '.jpeg', '.pdf')):
-                                    full_path = os.path.join(root, file)
-                                    self.addItem(full_path)
-                    else:
-                        # It's a file, add it if it has the correct extension
-                        if local_file.lower().endswith(('.png', '.jpg', '.jpeg', '.pdf')):
-                            self.addItem(local_file)
+            # Files and folders go through one scan, so they are added in the order they were dropped
+            self.scan([url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()])
             event.acceptProposedAction()
         else:
             super().dropEvent(event)
@@ -113,18 +96,14 @@ class ReorderableListWidget(QListWidget):
         Add files to the list widget from a given list of file paths.
         """
         for file_path in file_paths:
-            if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.pdf')):
+            if file_path.lower().endswith(MERGE_EXTENSIONS):
                 self.addItem(file_path)
 
     def addItemsFromDirectory(self, directory_path):
         """
-        Add files to the list widget from the selected directory.
+        Add files to the list widget from the selected directory, scanning it in the background.
         """
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg', '.pdf')):
-                    full_path = os.path.join(root, file)
-                    self.addItem(full_path)
+        self.scan([directory_path])
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Delete:
@@ -149,6 +128,16 @@ class MainWindow(QMainWindow):
         self.open_pdf_checkbox.setChecked(True)  # Checkbox will be checked by default
 
         self.output_file_name = ''
+
+        # Queued merges run in the background while the window stays usable
+        self.job_queue = None
+        self.job_items = {}  # Job id -> its line in jobs_list
+        self.job_signals = JobSignals()
+        self.job_signals.job_finished.connect(self.show_job_status)
+        self.jobs_timer = QTimer(self)
+        self.jobs_timer.setInterval(500)
+        self.jobs_timer.timeout.connect(self.refresh_jobs)
+
         self.setup_ui()
         self.create_menu_bar()
 
@@ -161,6 +150,29 @@ class MainWindow(QMainWindow):
         self.convert_button = QPushButton("Convert")
         self.convert_button.clicked.connect(self.on_convert_click)
 
+        self.queue_button = QPushButton("Add To Queue")
+        self.queue_button.setToolTip("Merge in the background, so the next set of files can be prepared right away")
+        self.queue_button.clicked.connect(self.on_queue_click)
+
+        # Filters for the files found in folders
+        self.include_line_edit = QLineEdit()
+        self.include_line_edit.setPlaceholderText("e.g. *.pdf; invoice_*")
+        self.include_line_edit.textChanged.connect(self.update_folder_filters)
+        self.exclude_line_edit = QLineEdit()
+        self.exclude_line_edit.setPlaceholderText("e.g. *draft*; backup")
+        self.exclude_line_edit.textChanged.connect(self.update_folder_filters)
+
+        self.cancel_scan_button = QPushButton("Cancel Scan")
+        self.cancel_scan_button.clicked.connect(self.list_widget.cancel_scans)
+        self.cancel_scan_button.setVisible(False)
+        self.list_widget.scan_signals.scan_started.connect(self.update_scan_status)
+        self.list_widget.scan_signals.files_found.connect(self.update_scan_status)
+        self.list_widget.scan_signals.scan_finished.connect(self.update_scan_status)
+
+        # Status of the queued jobs, shown once there are any
+        self.jobs_list = QListWidget()
+        self.jobs_list.setVisible(False)
+
         self.output_line_edit = QLineEdit()
         self.output_line_edit.setPlaceholderText("Enter output file name here...")
 
@@ -179,11 +191,23 @@ class MainWindow(QMainWindow):
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.add_files_button)
         buttons_layout.addWidget(self.add_folder_button)
+        buttons_layout.addWidget(self.cancel_scan_button)
         main_layout.addLayout(buttons_layout)
 
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Folder files to include:"))
+        filter_layout.addWidget(self.include_line_edit)
+        filter_layout.addWidget(QLabel("Exclude:"))
+        filter_layout.addWidget(self.exclude_line_edit)
+        main_layout.addLayout(filter_layout)
+
         main_layout.addWidget(self.list_widget)
         main_layout.addLayout(output_layout)
-        main_layout.addWidget(self.convert_button)
+        convert_layout = QHBoxLayout()
+        convert_layout.addWidget(self.convert_button)
+        convert_layout.addWidget(self.queue_button)
+        main_layout.addLayout(convert_layout)
+        main_layout.addWidget(self.jobs_list)
 
         container = QWidget()
         container.setLayout(main_layout)
@@ -212,6 +236,22 @@ class MainWindow(QMainWindow):
         if directory:
             self.list_widget.addItemsFromDirectory(directory)
 
+    def update_folder_filters(self):
+        # Used by the scans started from now on
+        self.list_widget.include_patterns = split_patterns(self.include_line_edit.text())
+        self.list_widget.exclude_patterns = split_patterns(self.exclude_line_edit.text())
+
+    def update_scan_status(self, *args):
+        scanning = self.list_widget.is_scanning()
+        self.cancel_scan_button.setVisible(scanning)
+        # The list is not complete until the scan is done
+        self.convert_button.setEnabled(not scanning)
+        self.queue_button.setEnabled(not scanning)
+        if scanning:
+            self.statusBar().showMessage(f"Scanning folders: {self.list_widget.count()} files in the list")
+        else:
+            self.statusBar().showMessage(f"{self.list_widget.count()} files in the list", 5000)
+
     def create_menu_bar(self):
         menu_bar = QMenuBar(self)
         file_menu = menu_bar.addMenu("&File")
@@ -233,29 +273,82 @@ class MainWindow(QMainWindow):
             self.output_line_edit.setText(file_name)
             self.output_file_name = file_name
 
-    def on_convert_click(self):
-        # You would connect this method to your backend processing here.
+    def conversion_inputs(self):
+        """Return (file_list, output_file) for the current files, or None after telling the user what is missing."""
+        if self.list_widget.is_scanning():
+            QMessageBox.warning(self, "Scanning Folders", "Please wait until the folders are scanned, or cancel the scan.")
+            return None
+
         file_list = [self.list_widget.item(i).text() for i in range(self.list_widget.count())]
         output_file = self.output_line_edit.text()
 
         if not output_file:
             QMessageBox.warning(self, "No Output File", "Please specify an output file name.")
-            return
+            return None
 
         if not file_list:
             QMessageBox.warning(self, "No Files", "Please drag and drop files to convert.")
-            return
+            return None
 
-        # Process Files:
         if not output_file.endswith('.pdf'):
             output_file += '.pdf'
+        return file_list, output_file
+
+    def on_convert_click(self):
+        inputs = self.conversion_inputs()
+        if inputs is None:
+            return
+        file_list, output_file = inputs
+
+        # Process Files:
         QMessageBox.information(self, "Conversion Started", f"Files will be converted to {output_file}")
         converter = ImagePDFConverter(file_list, output_file)
-        status = converter.convert()
+        try:
+            status = converter.convert()
+        except Exception as e:
+            QMessageBox.warning(self, "Conversion Failed", str(e))
+            return
         QMessageBox.information(self, "Conversion Completed", status)
         if self.open_pdf_checkbox.isChecked():
             self.open_pdf(output_file)
 
+    def on_queue_click(self):
+        inputs = self.conversion_inputs()
+        if inputs is None:
+            return
+        file_list, output_file = inputs
+
+        if self.job_queue is None:
+            self.job_queue = JobQueue(QUEUE_WORKERS, on_finished=self.job_signals.job_finished.emit)
+        try:
+            job_id = self.job_queue.submit(normalize_job({"type": "merge", "output": output_file, "inputs": file_list}))
+        except JobError as e:
+            QMessageBox.warning(self, "Output In Use", str(e))
+            return
+        self.job_items[job_id] = QListWidgetItem()
+        self.jobs_list.addItem(self.job_items[job_id])
+        self.jobs_list.setVisible(True)
+        self.show_job_status(job_id, self.job_queue.result(job_id))
+        self.jobs_timer.start()
+
+        # Start over for the next job
+        self.list_widget.cancel_scans()
+        self.list_widget.clear()
+        self.output_line_edit.clear()
+
+    def show_job_status(self, job_id, result):
+        text = f"{result['name']}: {result['status']}"
+        if result["status"] in ("ok", "failed"):
+            text += f" in {result['seconds']:.1f}s - {result['message']}"
+        self.job_items[job_id].setText(text)
+
+    def refresh_jobs(self):
+        # Finished jobs report themselves; this shows when queued ones start running
+        for result in self.job_queue.status():
+            self.show_job_status(result["id"], result)
+        if not self.job_queue.pending():
+            self.jobs_timer.stop()
+
     def open_pdf(self, file_path):
         try:
             if sys.platform == "win32":
@@ -268,11 +361,15 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "Could Not Open PDF", f"{e}")
 
     def handle_close(self, event):
-        # If needed, do any checks or cleanup before closing
+        # Jobs that already run are finished by the workers, queued ones are dropped
+        self.list_widget.cancel_scans()
+        if self.job_queue is not None:
+            self.job_queue.shutdown()
         event.accept()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for the image pool in frozen executables
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,173 @@
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    StreamObject,
+)
+
+
+class StreamingPdfWriter:
+    """
+    Writes a PDF to a binary file one page at a time. Every object is written out as soon as it is copied
+    or created, so only the xref offsets and the page object numbers are kept in memory until close().
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = [None]  # Byte offset of every object, by object number; 0 is the free list head
+        self.page_numbers = []  # Object numbers of the pages, in order
+        self.pages_number = self._reserve()  # The page tree root is written last, once all kids are known
+        self.stream.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write_object(self, number, obj):
+        self.offsets[number] = self.stream.tell()
+        self.stream.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(self.stream, None)
+        self.stream.write(b"\nendobj\n")
+
+    def _add_object(self, obj):
+        number = self._reserve()
+        self._write_object(number, obj)
+        return IndirectObject(number, 0, None)
+
+    def add_pdf(self, pdf_path, reader=None):
+        """
+        Copy every page of a PDF file. Objects shared between its pages (fonts, images) are written once.
+        An already parsed PdfReader of the file can be passed in; it is only read from.
+        Returns the number of pages copied.
+        """
+        if reader is None:
+            reader = PdfReader(pdf_path)
+        if reader.is_encrypted:
+            reader.decrypt("")  # Most "encrypted" PDFs only restrict permissions and use an empty password
+        object_map = {}  # (source object number, generation) -> object number in the output
+        pending = []
+        # Number all pages up front so links between them survive the copy
+        numbers = []
+        for page in reader.pages:
+            numbers.append(self._reserve())
+            source_ref = page.indirect_reference
+            if source_ref is not None:
+                object_map[(source_ref.idnum, source_ref.generation)] = numbers[-1]
+        for page, number in zip(reader.pages, numbers):
+            self._copy_page(page, number, object_map, pending)
+        return len(numbers)
+
+    def _copy_page(self, page, number, object_map, pending):
+        # The reader already copied inherited attributes (resources, boxes, rotation) onto the page
+        new_page = DictionaryObject()
+        for key, value in page.items():
+            if key != "/Parent":
+                new_page[NameObject(key)] = self._copy(value, object_map, pending)
+        new_page[NameObject("/Parent")] = IndirectObject(self.pages_number, 0, None)
+        self._write_object(number, new_page)
+        self.page_numbers.append(number)
+
+        # Write everything the page refers to; a work list instead of recursion copes with deep object graphs
+        while pending:
+            target_number, source = pending.pop()
+            self._write_object(target_number, self._copy(source.get_object(), object_map, pending))
+
+    def _copy(self, obj, object_map, pending):
+        """Return a copy of a direct object with its references renumbered for the output."""
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            number = object_map.get(key)
+            if number is None:
+                target = obj.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Page", "/Pages"):
+                    # Links to pages of other documents would drag in their whole page tree
+                    return NullObject()
+                number = object_map[key] = self._reserve()
+                pending.append((number, obj))
+            return IndirectObject(number, 0, None)
+        if isinstance(obj, StreamObject):
+            new_stream = EncodedStreamObject() if "/Filter" in obj else DecodedStreamObject()
+            new_stream._data = obj._data  # Copied as is, still compressed
+            for key, value in obj.items():
+                new_stream[NameObject(key)] = self._copy(value, object_map, pending)
+            return new_stream
+        if isinstance(obj, DictionaryObject):
+            new_dict = DictionaryObject()
+            for key, value in obj.items():
+                new_dict[NameObject(key)] = self._copy(value, object_map, pending)
+            return new_dict
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value, object_map, pending) for value in obj)
+        return obj
+
+    def add_jpeg_page(self, jpeg_data, width, height, color_space, page_width, page_height):
+        """
+        Add a page showing a JPEG image, embedded as is (DCTDecode), stretched to page_width x page_height points.
+        """
+        image = DecodedStreamObject()
+        image._data = jpeg_data
+        image.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(width),
+            NameObject("/Height"): NumberObject(height),
+            NameObject("/ColorSpace"): NameObject(color_space),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+            NameObject("/Filter"): NameObject("/DCTDecode"),
+        })
+        image_ref = self._add_object(image)
+
+        contents = DecodedStreamObject()
+        contents._data = f"q {page_width:.4f} 0 0 {page_height:.4f} 0 0 cm /Im0 Do Q".encode()
+        contents_ref = self._add_object(contents)
+
+        page = DictionaryObject({
+            NameObject("/Type"): NameObject("/Page"),
+            NameObject("/Parent"): IndirectObject(self.pages_number, 0, None),
+            NameObject("/MediaBox"): ArrayObject(
+                [NumberObject(0), NumberObject(0), _number(page_width), _number(page_height)]
+            ),
+            NameObject("/Resources"): DictionaryObject({
+                NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): image_ref}),
+            }),
+            NameObject("/Contents"): contents_ref,
+        })
+        self.page_numbers.append(self._add_object(page).idnum)
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer. The stream itself is left open."""
+        pages = DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(IndirectObject(number, 0, None) for number in self.page_numbers),
+            NameObject("/Count"): NumberObject(len(self.page_numbers)),
+        })
+        self._write_object(self.pages_number, pages)
+        catalog_ref = self._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(self.pages_number, 0, None),
+        }))
+
+        xref_offset = self.stream.tell()
+        self.stream.write(f"xref\n0 {len(self.offsets)}\n".encode())
+        self.stream.write(b"0000000000 65535 f \n")
+        for offset in self.offsets[1:]:
+            self.stream.write(f"{offset:010d} 00000 n \n".encode())
+        trailer = DictionaryObject({
+            NameObject("/Size"): NumberObject(len(self.offsets)),
+            NameObject("/Root"): catalog_ref,
+        })
+        self.stream.write(b"trailer\n")
+        trailer.write_to_stream(self.stream, None)
+        self.stream.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def _number(value):
+    # Whole values are written without a fraction
+    return NumberObject(int(value)) if float(value).is_integer() else FloatObject(round(value, 4))
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pytest
+
+from folder_scanner import FolderScan, natural_key, scan_paths, split_patterns
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def names(paths, root):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in paths]
+
+
+def test_natural_key_orders_numbers_by_value():
+    files = ["scan10.pdf", "Scan2.pdf", "scan1.pdf", "scan2b.pdf", "cover.pdf", "scan02.pdf"]
+    assert sorted(files, key=natural_key) == ["cover.pdf", "scan1.pdf", "Scan2.pdf", "scan02.pdf", "scan2b.pdf",
+                                              "scan10.pdf"]
+
+
+def test_split_patterns():
+    assert split_patterns(" *.pdf; invoice_*,, ") == ["*.pdf", "invoice_*"]
+
+
+def test_scan_lists_files_before_subfolders_in_natural_order(tmp_path):
+    for name in ["b/2.pdf", "b/10.pdf", "a/1.pdf", "3.PDF", "1.pdf", "notes.txt"]:
+        touch(tmp_path / name)
+    assert names(scan_paths([str(tmp_path)], (".pdf",)), tmp_path) == ["1.pdf", "3.PDF", "a/1.pdf", "b/2.pdf",
+                                                                      "b/10.pdf"]
+
+
+def test_scan_filters_names_and_folders(tmp_path):
+    for name in ["invoice_1.pdf", "other.pdf", "old/invoice_2.pdf", "new/invoice_3.pdf"]:
+        touch(tmp_path / name)
+    found = scan_paths([str(tmp_path)], (".pdf",), include=["INVOICE_*"], exclude=["old"])
+    assert names(found, tmp_path) == ["invoice_1.pdf", "new/invoice_3.pdf"]
+
+
+def test_files_given_by_name_are_always_taken(tmp_path):
+    touch(tmp_path / "skip.pdf")
+    paths = [str(tmp_path / "skip.pdf"), str(tmp_path / "skip.txt")]
+    assert list(scan_paths(paths, (".pdf",), exclude=["skip*"])) == paths[:1]
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_scan_does_not_follow_a_symlink_loop(tmp_path):
+    touch(tmp_path / "sub" / "page.pdf")
+    try:
+        os.symlink(tmp_path, tmp_path / "sub" / "loop", target_is_directory=True)
+    except OSError:
+        pytest.skip("symlinks are not permitted here")
+    assert names(scan_paths([str(tmp_path)], (".pdf",)), tmp_path) == ["sub/page.pdf"]
+
+
+def test_folder_scan_reports_batches_and_finish(tmp_path):
+    for index in range(3):
+        touch(tmp_path / f"{index}.pdf")
+    batches = []
+    finished = threading.Event()
+    result = []
+    scan = FolderScan([str(tmp_path)], [".pdf"], batches.append,
+                      lambda count, cancelled: (result.append((count, cancelled)), finished.set()))
+    scan.start()
+    assert finished.wait(10)
+    assert names([path for batch in batches for path in batch], tmp_path) == ["0.pdf", "1.pdf", "2.pdf"]
+    assert result == [(3, False)]
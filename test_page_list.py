@@ -0,0 +1,95 @@
+from page_list import PageList, PageListObserver
+
+
+class RecordingObserver(PageListObserver):
+    def __init__(self):
+        self.calls = []
+
+    def pages_reordered(self, new_rows):
+        self.calls.append(("reordered", new_rows))
+
+    def pages_removed(self, first, last):
+        self.calls.append(("removed", first, last))
+
+
+def make_list(*sources):
+    """A PageList with the given (source, page_count) pairs, plus an observer recording its changes."""
+    pages = PageList()
+    for source, page_count in sources:
+        pages.add_pages(source, [(612, 792)] * page_count)
+    observer = RecordingObserver()
+    pages.add_observer(observer)
+    return pages, observer
+
+
+def layout(pages):
+    return [(record.source, record.page_index) for record in pages]
+
+
+def test_move_rows_to_keeps_the_order_of_the_moved_rows():
+    pages, observer = make_list(("a.pdf", 6))
+    pages.move_rows_to([4, 1], 0)
+    assert [index for _, index in layout(pages)] == [1, 4, 0, 2, 3, 5]
+    assert observer.calls == [("reordered", [2, 0, 3, 4, 1, 5])]
+
+
+def test_move_rows_to_clamps_the_position():
+    pages, _ = make_list(("a.pdf", 4))
+    pages.move_rows_to([0], 99)
+    assert [index for _, index in layout(pages)] == [1, 2, 3, 0]
+
+
+def test_move_rows_to_in_place_does_not_notify():
+    pages, observer = make_list(("a.pdf", 4))
+    pages.move_rows_to([1, 2], 1)
+    assert [index for _, index in layout(pages)] == [0, 1, 2, 3]
+    assert observer.calls == []
+
+
+def test_move_rows_to_keeps_row_lookup_current():
+    pages, _ = make_list(("a.pdf", 3))
+    record = pages[2]
+    assert pages.row_of(record) == 2
+    pages.move_rows_to([2], 0)
+    assert pages.row_of(record) == 0
+
+
+def test_interleave_alternates_the_pages_of_two_sources():
+    pages, _ = make_list(("front.pdf", 3), ("back.pdf", 3))
+    pages.interleave("front.pdf", "back.pdf")
+    assert layout(pages) == [
+        ("front.pdf", 0), ("back.pdf", 0), ("front.pdf", 1), ("back.pdf", 1), ("front.pdf", 2), ("back.pdf", 2),
+    ]
+
+
+def test_interleave_reverse_second_appends_leftover_pages():
+    pages, _ = make_list(("other.pdf", 1), ("front.pdf", 3), ("back.pdf", 2))
+    pages.interleave("front.pdf", "back.pdf", reverse_second=True)
+    assert layout(pages) == [
+        ("other.pdf", 0), ("front.pdf", 0), ("back.pdf", 1), ("front.pdf", 1), ("back.pdf", 0), ("front.pdf", 2),
+    ]
+
+
+def test_interleave_with_a_missing_source_changes_nothing():
+    pages, observer = make_list(("front.pdf", 2))
+    pages.interleave("front.pdf", "back.pdf")
+    assert layout(pages) == [("front.pdf", 0), ("front.pdf", 1)]
+    assert observer.calls == []
+
+
+def test_remove_notifies_once_per_run_from_the_end():
+    pages, observer = make_list(("a.pdf", 7))
+    pages.remove([5, 1, 2, 6])
+    assert [index for _, index in layout(pages)] == [0, 3, 4]
+    assert observer.calls == [("removed", 5, 6), ("removed", 1, 2)]
+
+
+def test_remove_keeps_row_lookup_current():
+    pages, _ = make_list(("a.pdf", 4))
+    record = pages[3]
+    assert pages.row_of(record) == 3
+    pages.remove([0, 1])
+    assert pages.row_of(record) == 1
+    assert pages.sources() == {"a.pdf"}
+    pages.remove(range(len(pages)))
+    assert len(pages) == 0 and pages.sources() == set()
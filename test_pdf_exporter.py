@@ -0,0 +1,33 @@
+import os
+import stat
+
+import fitz  # PyMuPDF
+
+from pdf_exporter import export_pages, partial_file
+
+
+def test_partial_files_are_unique_and_next_to_the_output(tmp_path):
+    output = str(tmp_path / "out.pdf")
+    first, second = partial_file(output), partial_file(output)
+    assert first != second
+    assert os.path.dirname(first) == str(tmp_path) and first.endswith(".part")
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(first).st_mode) == 0o666 & ~umask
+
+
+def test_export_writes_the_partial_file_it_is_given(tmp_path):
+    source = str(tmp_path / "source.pdf")
+    with fitz.open() as doc:
+        for _ in range(3):
+            doc.new_page()
+        doc.save(source)
+    output = str(tmp_path / "out.pdf")
+    temp_file = partial_file(output)
+
+    export_pages([(source, 2, 90), (source, 0, 0)], output, temp_file=temp_file)
+
+    assert not os.path.exists(temp_file)
+    assert sorted(os.listdir(tmp_path)) == ["out.pdf", "source.pdf"]
+    with fitz.open(output) as doc:
+        assert [page.rotation for page in doc] == [90, 0]
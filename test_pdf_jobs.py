@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+import pdf_cli
+from pdf_exporter import page_ranges
+from pdf_jobs import JobError, load_manifest, normalize_job, parse_page_ranges, run_job
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("", 4) == [0, 1, 2, 3]
+    assert parse_page_ranges("1-2, 4", 4) == [0, 1, 3]
+    assert parse_page_ranges("3-", 5) == [2, 3, 4]
+    assert parse_page_ranges("-2", 5) == [0, 1]
+    assert parse_page_ranges("3-1", 3) == [2, 1, 0]
+
+
+@pytest.mark.parametrize("text", ["x", "1-y", "1,,2", "1.5"])
+def test_parse_page_ranges_rejects_malformed_ranges(text):
+    with pytest.raises(JobError, match="Invalid page range"):
+        parse_page_ranges(text, 5)
+
+
+@pytest.mark.parametrize("text", ["0", "6", "2-6", "6-2", "-0"])
+def test_parse_page_ranges_rejects_pages_outside_the_document(text):
+    with pytest.raises(JobError, match="outside pages 1-5"):
+        parse_page_ranges(text, 5)
+
+
+def test_job_error_is_a_value_error():
+    with pytest.raises(ValueError):
+        parse_page_ranges("9", 1)
+
+
+def pages_of(source, indexes, rotation=0):
+    return [(source, index, rotation) for index in indexes]
+
+
+def test_page_ranges_groups_forward_runs():
+    pages = pages_of("a.pdf", [0, 1, 2]) + pages_of("a.pdf", [5, 6], 90)
+    assert list(page_ranges(pages)) == [("a.pdf", 0, 2, [0, 0, 0]), ("a.pdf", 5, 6, [90, 90])]
+
+
+def test_page_ranges_groups_backward_runs():
+    pages = pages_of("a.pdf", [4, 3, 2]) + pages_of("a.pdf", [3])
+    assert list(page_ranges(pages)) == [("a.pdf", 4, 2, [0, 0, 0]), ("a.pdf", 3, 3, [0])]
+
+
+def test_page_ranges_keeps_the_direction_of_a_run():
+    # 0, 1 runs forward, so stepping back to 0 starts a new run
+    assert list(page_ranges(pages_of("a.pdf", [0, 1, 0]))) == [("a.pdf", 0, 1, [0, 0]), ("a.pdf", 0, 0, [0])]
+
+
+def test_page_ranges_splits_at_a_new_source():
+    pages = pages_of("a.pdf", [0, 1]) + pages_of("b.pdf", [2, 3]) + pages_of("a.pdf", [2])
+    assert list(page_ranges(pages)) == [
+        ("a.pdf", 0, 1, [0, 0]), ("b.pdf", 2, 3, [0, 0]), ("a.pdf", 2, 2, [0]),
+    ]
+
+
+def test_page_ranges_of_no_pages():
+    assert list(page_ranges([])) == []
+
+
+def test_normalize_job_resolves_paths_against_the_manifest_folder():
+    pages = ["a.pdf#2-1@90", {"source": "b.pdf", "pages": 3}]
+    job = normalize_job({"type": "export", "output": "out.pdf", "pages": pages}, "jobs")
+    assert job["output"] == os.path.join("jobs", "out.pdf")
+    assert job["pages"] == [{"source": os.path.join("jobs", "a.pdf"), "pages": "2-1", "rotation": 90},
+                            {"source": os.path.join("jobs", "b.pdf"), "pages": "3", "rotation": 0}]
+
+
+@pytest.mark.parametrize("job", [
+    {"output": "out.pdf", "inputs": "scans"},
+    {"output": "out.pdf", "inputs": ["a.pdf", 5]},
+    {"output": "out.pdf", "inputs": ["a.pdf"], "workers": "4"},
+    {"output": ["out.pdf"], "inputs": ["a.pdf"]},
+    {"type": "export", "output": "out.pdf", "pages": "a.pdf"},
+    {"type": "export", "output": "out.pdf", "pages": [5]},
+    {"type": "export", "output": "out.pdf", "pages": [{"source": "a.pdf", "rotation": [90]}]},
+    {"type": "export", "output": "out.pdf", "pages": [{"source": ["a.pdf"]}]},
+    {"type": "export", "output": "out.pdf", "pages": ["a.pdf"], "profile": ["fast"]},
+])
+def test_normalize_job_rejects_values_of_the_wrong_type(job):
+    with pytest.raises(JobError):
+        normalize_job(job)
+
+
+def test_cli_exits_with_usage_error_for_a_malformed_manifest(tmp_path, capsys):
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text(json.dumps([{"type": "export", "output": "out.pdf", "pages": [5]}]))
+    assert pdf_cli.main(["run", str(manifest)]) == pdf_cli.EXIT_USAGE
+    assert "page entry" in capsys.readouterr().err
+
+
+def test_merge_without_pages_fails_and_writes_nothing(tmp_path):
+    output = tmp_path / "out.pdf"
+    (tmp_path / "empty").mkdir()
+    result = run_job(normalize_job({"output": str(output), "inputs": [str(tmp_path / "empty")]}))
+    assert result["status"] == "failed" and "No images or PDF files" in result["message"]
+    assert not output.exists()
+
+
+def test_merge_of_a_missing_input_fails(tmp_path):
+    result = run_job(normalize_job({"output": str(tmp_path / "out.pdf"), "inputs": [str(tmp_path / "scans")]}))
+    assert result["status"] == "failed" and "does not exist" in result["message"]
+    assert pdf_cli.main(["merge", "-o", str(tmp_path / "out.pdf"), str(tmp_path / "scans")]) == pdf_cli.EXIT_JOB_FAILED
+
+
+def test_manifest_jobs_must_write_different_outputs(tmp_path):
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text(json.dumps([{"output": "out.pdf", "inputs": ["a.pdf"]},
+                                    {"output": "./out.pdf", "inputs": ["b.pdf"]}]))
+    with pytest.raises(JobError, match="More than one job"):
+        load_manifest(str(manifest))
@@ -0,0 +1,74 @@
+import io
+
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+
+from image_pages import prepare_image_page
+from image_pdf_converter import ImagePDFConverter
+from streaming_pdf_writer import StreamingPdfWriter
+
+
+def make_pdf(path, labels):
+    """Write a PDF with one page per label, the label being the page's text."""
+    with fitz.open() as doc:
+        for label in labels:
+            doc.new_page(width=300, height=400).insert_text((50, 100), label)
+        doc.save(path)
+    return str(path)
+
+
+def make_image(path, size=(200, 100)):
+    Image.new("RGB", size, (200, 30, 30)).save(path)
+    return str(path)
+
+
+def page_texts(doc):
+    return [page.get_text().strip() for page in doc]
+
+
+def test_writer_keeps_the_input_order(tmp_path):
+    first = make_pdf(tmp_path / "first.pdf", ["a1", "a2", "a3"])
+    second = make_pdf(tmp_path / "second.pdf", ["b1", "b2"])
+    image = make_image(tmp_path / "image.png")
+
+    output = io.BytesIO()
+    writer = StreamingPdfWriter(output)
+    assert writer.add_pdf(second) == 2
+    jpeg_data, width, height, color_space = prepare_image_page(image)
+    writer.add_jpeg_page(jpeg_data, width, height, color_space, width * 72 / 100, height * 72 / 100)
+    assert writer.add_pdf(first) == 3
+    writer.close()
+
+    with fitz.open(stream=output.getvalue(), filetype="pdf") as doc:
+        assert not doc.is_repaired  # The cross-reference table was valid as written
+        assert page_texts(doc) == ["b1", "b2", "", "a1", "a2", "a3"]
+        assert (doc[2].rect.width, doc[2].rect.height) == (144, 72)
+        assert len(doc[2].get_images()) == 1
+
+
+def test_converter_writes_inputs_in_list_order(tmp_path):
+    first = make_pdf(tmp_path / "first.pdf", ["a1", "a2"])
+    second = make_pdf(tmp_path / "second.pdf", ["b1"])
+    image = make_image(tmp_path / "image.jpg")
+    output = str(tmp_path / "merged.pdf")
+
+    status = ImagePDFConverter([second, image, first, str(tmp_path / "notes.txt")], output, workers=1).convert()
+
+    assert "1 image(s)" in status and "4 page(s)" in status
+    with fitz.open(output) as doc:
+        assert page_texts(doc) == ["b1", "", "a1", "a2"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_failed_conversion_keeps_the_existing_output(tmp_path):
+    output = make_pdf(tmp_path / "merged.pdf", ["old"])
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    with pytest.raises(Exception):
+        ImagePDFConverter([make_pdf(tmp_path / "good.pdf", ["new"]), str(broken)], output, workers=1).convert()
+
+    with fitz.open(output) as doc:
+        assert page_texts(doc) == ["old"]
+    assert not list(tmp_path.glob("*.part"))
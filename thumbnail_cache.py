@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Long edge, in pixels, of the thumbnail resolutions that get rendered and cached
+RESOLUTION_TIERS = (100, 200, 400, 800, 1600)
+DEFAULT_BUDGET = 256 * 1024 * 1024  # 256 MB
+DEFAULT_DISK_BUDGET = 1024 * 1024 * 1024  # 1 GB
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+
+def resolution_tier(size):
+    """
+    Return the smallest resolution tier that is at least `size` pixels, or the largest tier.
+    """
+    for tier in RESOLUTION_TIERS:
+        if tier >= size:
+            return tier
+    return RESOLUTION_TIERS[-1]
+
+
+class ThumbnailCache:
+    """
+    In-memory LRU cache of rendered pages, keyed by (source file, page index, rotation, resolution tier).
+    Entries are evicted, least recently used first, once their total size goes over the memory budget.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()  # key -> (image, size in bytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, image, nbytes):
+        old_entry = self._entries.pop(key, None)
+        if old_entry is not None:
+            self.used_bytes -= old_entry[1]
+        self._entries[key] = (image, nbytes)
+        self.used_bytes += nbytes
+        self.evict(self.budget_bytes)
+
+    def evict(self, budget_bytes):
+        # Always keep the most recent entry, even if it alone is over budget
+        while self.used_bytes > budget_bytes and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.used_bytes -= nbytes
+
+    def lookup(self, source, page_index, rotation, tier):
+        """
+        Return (tier, image) for the cached resolution nearest to `tier`, or None if nothing is cached.
+        Sharper tiers are preferred, since scaling down looks better than scaling up.
+        """
+        for candidate in sorted(RESOLUTION_TIERS, key=lambda t: (t < tier, abs(t - tier))):
+            image = self.get((source, page_index, rotation, candidate))
+            if image is not None:
+                return candidate, image
+        return None
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+
+def file_fingerprint(path):
+    """
+    Return a quick content hash of a file, built from its size and its first and last 64 KB.
+    Copies of a file share a fingerprint, and appending to a PDF (incremental saves) changes it.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+        if size > FINGERPRINT_SAMPLE_SIZE:
+            f.seek(max(FINGERPRINT_SAMPLE_SIZE, size - FINGERPRINT_SAMPLE_SIZE))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class DiskThumbnailCache:
+    """
+    Persistent thumbnail store: a directory of compressed images plus a small SQLite index that tracks
+    their sizes and when they were last used. Several render processes can share one directory.
+    """
+
+    def __init__(self, directory, budget_bytes=DEFAULT_DISK_BUDGET):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=10, isolation_level=None)
+        self.index.execute("PRAGMA journal_mode=WAL")
+        self.index.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails (name TEXT PRIMARY KEY, size INTEGER, last_used REAL)"
+        )
+
+    def _file_path(self, name):
+        return os.path.join(self.directory, name[:2], name + ".jpg")
+
+    @staticmethod
+    def entry_name(fingerprint, page_index, rotation, tier):
+        return f"{fingerprint}-{page_index}-{rotation}-{tier}"
+
+    def get(self, name):
+        try:
+            with open(self._file_path(name), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.index.execute("UPDATE thumbnails SET last_used = ? WHERE name = ?", (time.time(), name))
+        return data
+
+    def put(self, name, data):
+        file_path = self._file_path(name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, file_path)  # Readers never see a half written file
+        self.index.execute(
+            "INSERT OR REPLACE INTO thumbnails (name, size, last_used) VALUES (?, ?, ?)",
+            (name, len(data), time.time()),
+        )
+        self.evict()
+
+    def evict(self):
+        used_bytes = self.index.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+        if used_bytes <= self.budget_bytes:
+            return
+        # Trim to 90% of the budget so we are not evicting again on every put
+        target_bytes = self.budget_bytes * 0.9
+        for name, size in self.index.execute("SELECT name, size FROM thumbnails ORDER BY last_used").fetchall():
+            if used_bytes <= target_bytes:
+                break
+            self.index.execute("DELETE FROM thumbnails WHERE name = ?", (name,))
+            try:
+                os.remove(self._file_path(name))
+            except OSError:
+                pass  # Another process evicted it already
+            used_bytes -= size